@@ -0,0 +1,45 @@
+"""
+Inspeção em lote sem GUI.
+
+Uso:
+    python batch.py <diretório de imagens | vídeo> --profile <nome> [opções]
+
+Exemplo:
+    python batch.py resources/amostras --profile circulo --out resources/output/batch --workers 4
+"""
+import argparse
+
+from src.controller.BatchInspector import BatchInspector, load_profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspeção em lote com um perfil do plc_config.json")
+    parser.add_argument("source", help="Diretório de imagens ou ficheiro de vídeo")
+    parser.add_argument("--profile", required=True, help="Nome do perfil gravado")
+    parser.add_argument("--config", default="plc_config.json", help="Ficheiro de configuração (padrão: plc_config.json)")
+    parser.add_argument("--out", default="resources/output/batch", help="Diretório de saída")
+    parser.add_argument("--workers", type=int, default=None, help="Número de processos (padrão: núcleos da CPU)")
+    parser.add_argument("--format", choices=["csv", "json", "both"], default="both", help="Formato dos resultados")
+    parser.add_argument("--color-stat", choices=["mean", "median"], default=None,
+                        help="Estatística da cor da região de cada objeto")
+    args = parser.parse_args()
+
+    params = load_profile(args.profile, args.config)
+    if args.color_stat:
+        params["color_stat"] = args.color_stat
+    formats = ("csv", "json") if args.format == "both" else (args.format,)
+
+    inspector = BatchInspector(params, workers=args.workers)
+    summary = inspector.run(args.source, args.out, formats)
+
+    print(f"Imagens: {summary['images']} (erros: {summary['errors']}), objetos: {summary['objects']}")
+    print(f"Tempo total: {summary['elapsed_s']:.2f} s com {summary['workers']} processos "
+          f"-> {summary['images_per_s']:.1f} imagens/s")
+    print("Tempo médio por etapa (ms/imagem):")
+    for stage, ms in sorted(summary["stage_ms"].items(), key=lambda item: -item[1]):
+        print(f"  {stage:<12} {ms:8.2f}")
+    print(f"Resultados em {args.out}")
+
+
+if __name__ == "__main__":
+    main()
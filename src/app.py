@@ -94,6 +94,8 @@ class AplicacaoApp(tk.Tk):
             self.frames["StatusWindow"].parar_monitoramento()
 
     def fechar_app(self):
+        # Para a thread de captura antes de libertar a câmera
+        self.frames["PaginaVideo"].parar_video()
         if self.cap.isOpened():
             self.cap.release()
         self.shared_plc.stop()
@@ -0,0 +1,228 @@
+import csv
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+
+from .ProcessingPipeline import STAGES
+from .StageGraph import StageGraph
+from .util.BufferPool import BufferPool
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+
+# Valores iniciais dos sliders de PaginaVideo, usados quando o perfil não tem a chave
+DEFAULT_PARAMS = {
+    "hsv_min": (50, 150, 150),
+    "hsv_max": (50, 150, 150),
+    "threshold": (50, 150),
+    "blur": 1,
+    "inverse_mask": False,
+    "segmentation_type": "by_color",
+    "circle_hough": (1, 40, 50, 25, 10, 100),
+    "pyramid_levels": 0,
+    "circle_engine": "hough",
+}
+
+OBJECT_FIELDS = ["image", "id", "color", "area", "perimeter", "center_x", "center_y",
+                 "is_circular", "hole_count", "region_b", "region_g", "region_r",
+                 "region_h", "region_s", "region_v"]
+IMAGE_FIELDS = ["image", "total_objects", "circular_objects", "non_circular_objects", "objects_with_holes",
+                "red_objects", "blue_objects", "white_objects", "undefined_objects", "circles", "time_ms", "error"]
+
+# Estado de cada processo do pool (preenchido por _init_worker)
+_worker = {}
+
+
+def load_profile(name, config_path="plc_config.json"):
+    """Parâmetros de processamento do perfil `name` gravado em plc_config.json."""
+    with open(config_path, "r") as f:
+        config = json.load(f)
+    for profile in config.get("profiles", []):
+        if profile.get("profile") == name:
+            params = dict(DEFAULT_PARAMS)
+            params.update(profile)
+            return params
+    raise KeyError(f"Perfil '{name}' não encontrado em {config_path}")
+
+
+def _init_worker(params):
+    # Um processo por núcleo: o OpenCV não deve abrir as suas próprias threads
+    cv2.setNumThreads(1)
+    _worker["params"] = params
+    _worker["pool"] = BufferPool(generations=1)
+    _worker["graph"] = StageGraph(STAGES)
+
+
+def _inspect_frame(name, image):
+    """Resultado de um frame: estatísticas, círculos, objetos e tempos por etapa (s)."""
+    pool, graph = _worker["pool"], _worker["graph"]
+    values = graph.run(image, _worker["params"], ["objects", "circles"], pool)
+    objects, stats = values["objects"]
+    return {
+        "image": name,
+        "stats": stats,
+        "circles": [list(c) for c in values["circles"]],
+        "objects": objects,
+        "timings": dict(graph.timings),
+    }
+
+
+def _error_record(name, error):
+    return {"image": name, "stats": {}, "circles": [], "objects": [], "timings": {}, "error": error}
+
+
+def _inspect_safely(name, image, load):
+    """_inspect_frame que transforma uma exceção num registo de erro (o lote continua)."""
+    try:
+        record = _inspect_frame(name, image)
+    except Exception as e:
+        return _error_record(name, f"{type(e).__name__}: {e}")
+    record["timings"]["load"] = load
+    return record
+
+
+def _run_task(task):
+    """
+    Executa uma tarefa num processo do pool:
+        ("image", caminho)                -> um frame
+        ("video", caminho, início, fim)   -> frames [início, fim) do vídeo
+                                             (fim None: até read() falhar)
+    Os frames são lidos no próprio processo, para não passarem pela fila.
+    Um frame que falhe vira um registo de erro, sem interromper os restantes.
+    """
+    records = []
+    if task[0] == "image":
+        path = task[1]
+        name = os.path.basename(path)
+        t0 = time.perf_counter()
+        image = cv2.imread(path)
+        load = time.perf_counter() - t0
+        if image is None:
+            return [_error_record(name, "imagem ilegível")]
+        return [_inspect_safely(name, image, load)]
+
+    _, path, start, end = task
+    cap = cv2.VideoCapture(path)
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start)
+        stem = os.path.basename(path)
+        index = start
+        while end is None or index < end:
+            t0 = time.perf_counter()
+            ret, frame = cap.read()
+            load = time.perf_counter() - t0
+            if not ret:
+                break
+            records.append(_inspect_safely(f"{stem}#{index}", frame, load))
+            index += 1
+    finally:
+        cap.release()
+    return records
+
+
+class BatchInspector:
+    """
+    Inspeção em lote, sem GUI, de um diretório de imagens ou de um vídeo.
+
+    Usa a mesma cadeia de etapas do vídeo ao vivo (STAGES) com os parâmetros
+    de um perfil, espalhando as imagens (ou blocos de frames do vídeo) por um
+    ProcessPoolExecutor. Escreve os resultados por objeto e por imagem em
+    CSV e/ou JSON e um resumo de throughput com o tempo médio de cada etapa.
+    """
+    def __init__(self, params, workers=None, video_chunk=64):
+        self.params = params
+        self.workers = workers or os.cpu_count() or 1
+        self.video_chunk = video_chunk
+
+    def make_tasks(self, source):
+        if os.path.isdir(source):
+            names = sorted(n for n in os.listdir(source) if n.lower().endswith(IMAGE_EXTENSIONS))
+            return [("image", os.path.join(source, n)) for n in names]
+
+        cap = cv2.VideoCapture(source)
+        if not cap.isOpened():
+            raise ValueError(f"Não foi possível abrir '{source}' como vídeo ou diretório de imagens")
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        if total <= 0:
+            # Contentor sem contagem de frames (0 ou -1): lê tudo sequencialmente numa tarefa
+            return [("video", source, 0, None)]
+        tasks = [("video", source, start, min(start + self.video_chunk, total))
+                 for start in range(0, total, self.video_chunk)]
+        # A contagem é uma estimativa do contentor: o último bloco lê até ao fim real
+        tasks[-1] = tasks[-1][:3] + (None,)
+        return tasks
+
+    def run(self, source, output_dir, formats=("csv", "json")):
+        """Processa `source` e grava os resultados em output_dir. Retorna o resumo."""
+        tasks = self.make_tasks(source)
+        records = []
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.params,)) as executor:
+            for task_records in executor.map(_run_task, tasks):
+                records.extend(task_records)
+        elapsed = time.perf_counter() - t0
+
+        summary = self.summarize(records, elapsed)
+        os.makedirs(output_dir, exist_ok=True)
+        if "csv" in formats:
+            self.write_csv(records, output_dir)
+        if "json" in formats:
+            with open(os.path.join(output_dir, "results.json"), "w") as f:
+                json.dump({"profile": self.params.get("profile"), "summary": summary, "images": records},
+                          f, indent=2, default=_to_json)
+        with open(os.path.join(output_dir, "summary.json"), "w") as f:
+            json.dump(summary, f, indent=4)
+        return summary
+
+    def summarize(self, records, elapsed):
+        ok = [r for r in records if "error" not in r]
+        stage_totals = {}
+        for r in ok:
+            for stage, seconds in r["timings"].items():
+                stage_totals[stage] = stage_totals.get(stage, 0.0) + seconds
+        return {
+            "images": len(records),
+            "errors": len(records) - len(ok),
+            "objects": sum(len(r["objects"]) for r in ok),
+            "workers": self.workers,
+            "elapsed_s": elapsed,
+            "images_per_s": len(ok) / elapsed if elapsed > 0 else 0.0,
+            # Tempo médio de cada etapa por imagem, dentro de um processo
+            "stage_ms": {stage: total / len(ok) * 1000 for stage, total in stage_totals.items()} if ok else {},
+        }
+
+    def write_csv(self, records, output_dir):
+        with open(os.path.join(output_dir, "objects.csv"), "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=OBJECT_FIELDS)
+            writer.writeheader()
+            for r in records:
+                for obj in r["objects"]:
+                    b, g, red = obj["region_color"]
+                    h, s, v = obj["region_hsv"]
+                    writer.writerow({
+                        "image": r["image"], "id": obj["id"], "color": obj["color"],
+                        "area": round(obj["area"], 2), "perimeter": round(obj["perimeter"], 2),
+                        "center_x": obj["center"][0], "center_y": obj["center"][1],
+                        "is_circular": obj["is_circular"], "hole_count": obj["hole_count"],
+                        "region_b": b, "region_g": g, "region_r": red,
+                        "region_h": h, "region_s": s, "region_v": v,
+                    })
+
+        with open(os.path.join(output_dir, "images.csv"), "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=IMAGE_FIELDS)
+            writer.writeheader()
+            for r in records:
+                row = dict(r["stats"], image=r["image"], circles=len(r["circles"]), error=r.get("error", ""))
+                row["time_ms"] = round(sum(r["timings"].values()) * 1000, 3)
+                writer.writerow(row)
+
+
+def _to_json(value):
+    """Converte tipos numpy para JSON."""
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class EventCoalescer:
+    """
+    Junta rajadas de eventos da UI (sliders, radios, checkboxes) num só processamento.
+
+    Há no máximo um trabalho em execução e um pedido pendente: os pedidos que
+    chegam durante a execução só marcam que é preciso processar outra vez
+    (o mais recente ganha). O snapshot dos parâmetros é lido na thread do
+    Tkinter no momento em que o trabalho arranca, por isso usa sempre os
+    valores mais novos. O trabalho corre numa thread de fundo e o resultado é
+    entregue a on_done na thread do Tkinter (via after), antes de arrancar o
+    trabalho seguinte.
+    """
+    def __init__(self, widget, snapshot, job, on_done, poll_ms=5):
+        self.widget = widget        # Qualquer widget Tkinter, para agendar com after()
+        self.snapshot = snapshot    # () -> payload; chamado na thread do Tkinter
+        self.job = job              # (payload) -> resultado; chamado na thread de fundo
+        self.on_done = on_done      # (resultado) -> None; chamado na thread do Tkinter
+        self.poll_ms = poll_ms
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._future = None
+        self._pending = False
+        self._discard = False       # O resultado em execução não deve ser entregue
+        self.stats = {'requests': 0, 'coalesced': 0, 'runs': 0, 'errors': 0}
+
+    def request(self):
+        """Pede um processamento (thread do Tkinter)."""
+        self.stats['requests'] += 1
+        if self._future is not None:
+            if self._pending:
+                self.stats['coalesced'] += 1
+            self._pending = True
+            return
+        self._start()
+
+    def cancel(self):
+        """Descarta o pedido pendente; o resultado em execução não é entregue."""
+        self._pending = False
+        self._discard = self._future is not None
+
+    def busy(self):
+        return self._future is not None
+
+    def _start(self):
+        self._pending = False
+        self._discard = False
+        payload = self.snapshot()
+        if payload is None:
+            return
+        self.stats['runs'] += 1
+        self._future = self._executor.submit(self.job, payload)
+        self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        future = self._future
+        if not future.done():
+            self.widget.after(self.poll_ms, self._poll)
+            return
+        self._future = None
+        try:
+            result = future.result()
+        except Exception as e:
+            self.stats['errors'] += 1
+            print(f"Erro no processamento agendado: {e}")
+        else:
+            if not self._discard:
+                self.on_done(result)
+        if self._pending:
+            self._start()
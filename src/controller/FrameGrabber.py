@@ -0,0 +1,201 @@
+import bisect
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.model.LatencyMonitor import LatencyMonitor
+
+
+@dataclass(frozen=True)
+class CapturedFrame:
+    """
+    Frame capturado com o seu identificador sequencial e instante de captura
+    (timestamp em time.perf_counter; wall_time em time.time, comparável com
+    o SourceTimestamp do PLC).
+    """
+    frame_id: int
+    timestamp: float
+    image: np.ndarray
+    wall_time: float = 0.0
+
+
+class FrameGrabber:
+    """
+    Captura frames da câmera numa thread dedicada.
+
+    Mantém apenas o frame mais recente (buffer de um slot). Se um frame novo
+    chega antes de o anterior ser consumido, o anterior é descartado e contado
+    como 'dropped'. Assim o consumidor (Tkinter) nunca bloqueia em cap.read()
+    e nunca processa frames atrasados acumulados no decoder.
+
+    Guarda também um histórico circular dos últimos `history_frames` frames
+    (limitado a `history_bytes` de memória) para find_frame escolher o frame
+    mais próximo do instante de um trigger do PLC, que chega com atraso.
+    """
+    def __init__(self, cap=None, source_name="0", history_frames=90, history_bytes=128 * 1024 * 1024):
+        self.cap = cap
+        self.source_name = str(source_name)
+        self.running = False
+        self._thread = None
+        self._lock = threading.Lock()
+        self._slot = None          # Último CapturedFrame capturado
+        self._consumed = True      # O frame do slot já foi entregue?
+        self._next_id = 0
+        self.read_errors = 0
+        # Contadores por fonte: {source_name: {'captured', 'dropped', 'processed'}}
+        self.stats = {}
+        self._ensure_stats(self.source_name)
+        self.history_frames = history_frames
+        self.history_bytes = history_bytes
+        self._history = deque()    # CapturedFrame por ordem de captura
+        self._history_nbytes = 0
+        self.history_stats = {'hits': 0, 'misses': 0, 'offset_sum': 0.0, 'age_sum': 0.0, 'age_max': 0.0}
+
+    def _ensure_stats(self, source_name):
+        if source_name not in self.stats:
+            self.stats[source_name] = {'captured': 0, 'dropped': 0, 'processed': 0}
+        return self.stats[source_name]
+
+    def set_source(self, cap, source_name):
+        """Troca a fonte de captura, reiniciando a thread se estava ativa."""
+        was_running = self.running
+        self.stop()
+        with self._lock:
+            self.cap = cap
+            self.source_name = str(source_name)
+            self._slot = None
+            self._consumed = True
+            self._history.clear()
+            self._history_nbytes = 0
+            self._ensure_stats(self.source_name)
+        self.read_errors = 0
+        if was_running:
+            self.start()
+
+    def start(self):
+        if self.running or self.cap is None:
+            return
+        self.running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Para a thread de captura e aguarda que ela termine o read() em curso."""
+        self.running = False
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(2.0)
+        self._thread = None
+
+    def _run(self):
+        cap = self.cap
+        counters = self._ensure_stats(self.source_name)
+        monitor = LatencyMonitor()
+        while self.running:
+            if not cap.isOpened():
+                time.sleep(0.5)
+                continue
+
+            t0 = monitor.start()
+            ret, frame = cap.read()
+            monitor.stop("capture", t0)
+            if not ret:
+                self.read_errors += 1
+                # Se falhar consecutivamente, desacelera para evitar alto uso de CPU
+                time.sleep(0.5 if self.read_errors > 5 else 0.015)
+                continue
+
+            self.read_errors = 0
+            captured_at = time.perf_counter()
+            wall_time = time.time()
+            with self._lock:
+                if not self._consumed:
+                    counters['dropped'] += 1
+                self._slot = CapturedFrame(self._next_id, captured_at, frame, wall_time)
+                self._next_id += 1
+                self._consumed = False
+                counters['captured'] += 1
+                self._push_history(self._slot)
+
+    def _push_history(self, captured):
+        """Acrescenta ao histórico, descartando os mais antigos acima dos limites (com o lock)."""
+        self._history.append(captured)
+        self._history_nbytes += captured.image.nbytes
+        while self._history and (len(self._history) > self.history_frames
+                                 or self._history_nbytes > self.history_bytes):
+            self._history_nbytes -= self._history.popleft().image.nbytes
+
+    def find_frame(self, wall_time, tolerance=0.1):
+        """
+        Frame do histórico capturado mais perto de wall_time (segundos, time.time()).
+        Retorna None (miss) se o histórico está vazio ou se o frame mais próximo
+        está a mais de `tolerance` segundos (ex.: o instante já saiu do histórico).
+        """
+        with self._lock:
+            history = list(self._history)
+        best = None
+        if history:
+            times = [f.wall_time for f in history]
+            i = bisect.bisect_left(times, wall_time)
+            candidates = history[max(0, i - 1):i + 1]
+            best = min(candidates, key=lambda f: abs(f.wall_time - wall_time))
+            if abs(best.wall_time - wall_time) > tolerance:
+                best = None
+
+        with self._lock:
+            stats = self.history_stats
+            if best is None:
+                stats['misses'] += 1
+            else:
+                age = time.time() - best.wall_time
+                stats['hits'] += 1
+                stats['offset_sum'] += abs(best.wall_time - wall_time)
+                stats['age_sum'] += age
+                stats['age_max'] = max(stats['age_max'], age)
+        return best
+
+    def get_latest(self):
+        """Retorna o frame mais recente ainda não consumido, ou None."""
+        with self._lock:
+            if self._consumed:
+                return None
+            self._consumed = True
+            return self._slot
+
+    def peek_latest(self):
+        """Retorna o último frame capturado (mesmo que já consumido), sem o consumir."""
+        with self._lock:
+            return self._slot
+
+    def mark_processed(self):
+        with self._lock:
+            self.stats[self.source_name]['processed'] += 1
+
+    def get_history_stats(self):
+        """
+        Estado do histórico e resultado das procuras de find_frame:
+        frames/bytes guardados, hits, misses e, dos hits, a distância média ao
+        instante pedido (offset_ms) e a idade média/máxima do frame escolhido.
+        """
+        with self._lock:
+            stats = dict(self.history_stats)
+            frames, nbytes = len(self._history), self._history_nbytes
+            span = self._history[-1].wall_time - self._history[0].wall_time if self._history else 0.0
+        hits = stats['hits']
+        return {
+            'frames': frames,
+            'bytes': nbytes,
+            'span_ms': span * 1000,
+            'hits': hits,
+            'misses': stats['misses'],
+            'offset_ms': stats['offset_sum'] / hits * 1000 if hits else 0.0,
+            'age_ms': stats['age_sum'] / hits * 1000 if hits else 0.0,
+            'age_max_ms': stats['age_max'] * 1000,
+        }
+
+    def get_stats(self, source_name=None):
+        """Cópia dos contadores de uma fonte (por omissão, a fonte atual)."""
+        with self._lock:
+            return dict(self.stats.get(source_name or self.source_name, {}))
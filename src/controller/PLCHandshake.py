@@ -0,0 +1,259 @@
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from src.model.LatencyMonitor import LatencyMonitor
+from src.model.OpcuaDTO import OpcuaDTO
+
+IDLE = "IDLE"
+WAIT_INSPECTION = "WAIT_INSPECTION"
+SIGNAL_HIGH = "SIGNAL_HIGH"
+SIGNAL_LOW = "SIGNAL_LOW"
+
+# Chave "handshake" do plc_config.json (valores em falta usam estes)
+DEFAULT_HANDSHAKE = {
+    "ns": 4,
+    "signal": "SinalPython",
+    "inspection_timeout_ms": 1000,  # Borda do trigger -> resultado da inspeção
+    "ack_timeout_ms": 1000,         # Escrita -> leitura do mesmo valor de volta
+    "pulse_ms": 100,                # Tempo mínimo do sinal em True
+    "retries": 2,                   # Reescritas antes de desistir do ciclo
+    "wait_ack": True,               # False: não espera pela leitura de volta do sinal
+}
+
+
+class PLCHandshake:
+    """
+    Máquina de estados do handshake trigger -> inspeção -> sinal com o PLC.
+
+        IDLE --borda de subida do trigger--> WAIT_INSPECTION
+        WAIT_INSPECTION --peça detetada--> SIGNAL_HIGH (escreve True)
+        WAIT_INSPECTION --sem peça / timeout--> IDLE
+        SIGNAL_HIGH --ack (sinal lido True) e pulse_ms--> SIGNAL_LOW (escreve False)
+        SIGNAL_LOW --ack (sinal lido False)--> IDLE
+
+    As bordas do trigger e os acks chegam como eventos do OpcuaDTO (thread do
+    PLC); report_inspection e tick são chamados na thread do Tkinter. Os
+    prazos são em tempo (time.perf_counter), não em frames: sem ack dentro de
+    ack_timeout_ms a escrita é repetida até `retries` vezes. Cada transição
+    fica registada com o instante em `history`; os ciclos perdidos (timeout
+    da inspeção, ack em falta, trigger a meio de um ciclo) são contados em
+    `missed` e a latência borda -> ack do True vai para o LatencyMonitor
+    ("handshake").
+
+    write(value, timestamp): envia o sinal ao PLC (timestamp é o instante de
+    captura do frame inspecionado, ou None).
+    on_trigger(source_timestamp): chamado (thread do PLC) em cada borda de subida.
+    Os eventos só chegam se o trigger e o sinal estiverem subscritos no
+    SharedPLC (`nodes` lista os dois como (ns, nome)).
+    """
+    def __init__(self, write, on_trigger=None, config=None):
+        self.write = write
+        self.on_trigger = on_trigger
+        self.enabled = False
+        self.trigger_node = "ns=4;s=CamaraS"
+        self._lock = threading.Lock()
+        self._trigger_level = False
+        self.trigger_at = 0.0
+        self.acked_at = 0.0
+        self.history = deque(maxlen=200)   # (instante, estado anterior, estado novo, motivo)
+        self.latencies = deque(maxlen=256)  # Borda -> ack do True (s)
+        self.cycles = 0
+        self.no_part = 0
+        self.retries_used = 0
+        self.missed = {"inspection_timeout": 0, "ack_timeout": 0, "overrun": 0}
+        self.configure(config)
+        self._enter(IDLE, "início")
+
+    def configure(self, config=None):
+        cfg = dict(DEFAULT_HANDSHAKE)
+        cfg.update(config or {})
+        self.config = cfg
+        self.signal_name = cfg["signal"]
+        self.signal_node = f"ns={cfg['ns']};s={cfg['signal']}"
+        self._watch()
+
+    def nodes(self):
+        """(ns, nome) do trigger e do sinal, para subscrever no SharedPLC."""
+        ns, name = self.trigger_node[3:].split(";s=", 1)
+        return [(int(ns), name), (self.config["ns"], self.signal_name)]
+
+    def set_trigger_node(self, node_id):
+        if node_id != self.trigger_node:
+            self.trigger_node = node_id
+            self._trigger_level = False
+            self._watch()
+
+    def _watch(self):
+        """Recebe do OpcuaDTO só as mudanças do trigger e do sinal."""
+        OpcuaDTO().add_observer(self._on_change, (self.trigger_node, self.signal_node))
+
+    def _enter(self, state, reason, now=None):
+        """Muda de estado e regista a transição (com o lock)."""
+        now = time.perf_counter() if now is None else now
+        previous = getattr(self, "state", None)
+        self.state = state
+        self.entered_at = now
+        self.history.append((now, previous, state, reason))
+        if state == IDLE:
+            self._inspected = False
+            self._acked = False
+            self._attempts = 0
+            self._frame_ts = None
+        self._retry_at = now  # Base do prazo do ack: entrada no estado ou última reescrita
+
+    def _miss(self, reason, now):
+        self.missed[reason] += 1
+        print(f"Handshake PLC: ciclo perdido ({reason}) em {self.state}")
+        self._enter(IDLE, reason, now)
+
+    # --- Eventos do OpcuaDTO (thread do PLC) ---------------------------------
+
+    def _on_change(self, node_id, value):
+        if node_id == self.trigger_node:
+            level = bool(value)
+            rising = level and not self._trigger_level
+            self._trigger_level = level
+            if rising and self.enabled:
+                self._on_rising_edge(node_id)
+        elif node_id == self.signal_node:
+            self._on_signal(bool(value))
+
+    def _on_rising_edge(self, node_id):
+        with self._lock:
+            now = time.perf_counter()
+            if self.state in (SIGNAL_HIGH, SIGNAL_LOW):
+                # O ciclo anterior ainda não acabou: este trigger fica sem resposta
+                self.missed["overrun"] += 1
+                self.history.append((now, self.state, self.state, "overrun"))
+                return
+            if self.state == WAIT_INSPECTION:
+                self.missed["overrun"] += 1
+            self.trigger_at = now
+            self._enter(WAIT_INSPECTION, "trigger", now)
+        if self.on_trigger is not None:
+            self.on_trigger(OpcuaDTO().get_timestamp(node_id))
+
+    def _on_signal(self, level):
+        with self._lock:
+            now = time.perf_counter()
+            if self.state == SIGNAL_HIGH and level and not self._acked:
+                self._ack_high(now)
+            elif self.state == SIGNAL_LOW and not level:
+                self._finish(now)
+
+    def _ack_high(self, now):
+        self._acked = True
+        self.acked_at = now
+        latency = now - self.trigger_at
+        self.latencies.append(latency)
+        LatencyMonitor().record("handshake", latency)
+        self.history.append((now, SIGNAL_HIGH, SIGNAL_HIGH, "ack"))
+
+    def _finish(self, now, reason="ack"):
+        self.cycles += 1
+        self._enter(IDLE, reason, now)
+
+    # --- Chamados na thread do Tkinter ----------------------------------------
+
+    def report_inspection(self, detected, timestamp=None, final=True):
+        """
+        Resultado de uma inspeção. Só tem efeito em WAIT_INSPECTION.
+        final=False (vídeo contínuo): sem peça, continua à espera até ao timeout.
+        Retorna True se o sinal foi levantado (a peça foi sinalizada).
+        """
+        with self._lock:
+            if self.state != WAIT_INSPECTION:
+                return False
+            self._inspected = True
+            now = time.perf_counter()
+            if detected:
+                self._frame_ts = timestamp
+                self._attempts = 1
+                self._enter(SIGNAL_HIGH, "peça", now)
+                # Sem espera pelo ack, ou o sinal já está em True no PLC (a escrita
+                # não vai gerar uma notificação de mudança): confirmado desde já
+                values, _ = OpcuaDTO().snapshot((self.signal_node,))
+                if not self.config["wait_ack"] or values.get(self.signal_node):
+                    self._ack_high(now)
+                write = True
+            elif final:
+                self.no_part += 1
+                self._enter(IDLE, "sem peça", now)
+                write = False
+            else:
+                return False
+        if write:
+            self.write(True, timestamp)
+        return write
+
+    def tick(self):
+        """Verifica prazos (timeouts, largura do pulso) e repete escritas."""
+        cfg = self.config
+        action = None
+        with self._lock:
+            now = time.perf_counter()
+            elapsed = now - self.entered_at
+            if not self.enabled and self.state != IDLE:
+                if self.state in (SIGNAL_HIGH, SIGNAL_LOW):
+                    action = (False, None)  # Não deixa o sinal preso em True no PLC
+                self._enter(IDLE, "desligado", now)
+            elif self.state == WAIT_INSPECTION and elapsed * 1000 > cfg["inspection_timeout_ms"]:
+                if self._inspected:
+                    self.no_part += 1
+                    self._enter(IDLE, "sem peça", now)
+                else:
+                    self._miss("inspection_timeout", now)
+            elif self.state == SIGNAL_HIGH:
+                if self._acked and (now - self.acked_at) * 1000 >= cfg["pulse_ms"]:
+                    values, _ = OpcuaDTO().snapshot((self.signal_node,))
+                    if cfg["wait_ack"] and values.get(self.signal_node) is False:
+                        # O PLC já repôs o sinal: escrever False não geraria a notificação do ack
+                        self._finish(now, "reposto pelo PLC")
+                    else:
+                        self._attempts = 1
+                        self._enter(SIGNAL_LOW, "pulso", now)
+                        action = (False, None)
+                        if not cfg["wait_ack"]:
+                            self._finish(now)
+                elif not self._acked:
+                    action = self._retry(True, now)
+            elif self.state == SIGNAL_LOW:
+                action = self._retry(False, now)
+        if action is not None:
+            self.write(*action)
+
+    def _retry(self, value, now):
+        """Reescreve `value` se o ack passou do prazo; desiste após `retries`."""
+        cfg = self.config
+        if (now - self._retry_at) * 1000 <= cfg["ack_timeout_ms"]:
+            return None
+        if self._attempts > cfg["retries"]:
+            self._miss("ack_timeout", now)
+            return (False, None) if value else None  # Não deixa o sinal preso em True
+        self._attempts += 1
+        self.retries_used += 1
+        self._retry_at = now
+        self.history.append((now, self.state, self.state, "retry"))
+        return (value, self._frame_ts if value else None)
+
+    def metrics(self):
+        """Contadores e latência borda -> ack (ms) para a UI e para testes."""
+        with self._lock:
+            latencies = np.array(self.latencies) * 1000
+            result = {
+                "state": self.state,
+                "cycles": self.cycles,
+                "no_part": self.no_part,
+                "retries": self.retries_used,
+                "missed": dict(self.missed),
+            }
+        if len(latencies):
+            result["latency_ms"] = {
+                "p50": float(np.percentile(latencies, 50)),
+                "p95": float(np.percentile(latencies, 95)),
+                "max": float(latencies.max()),
+            }
+        return result
@@ -0,0 +1,365 @@
+import os
+import queue
+import threading
+from collections import deque
+from dataclasses import dataclass
+
+import cv2
+import math
+import numpy as np
+
+from src.model.LatencyMonitor import LatencyMonitor
+from .StageGraph import StageGraph
+from .util.BufferPool import BufferPool
+from .util.ProcessImage import ProcessImage
+from .util.RegionOfInterest import RegionOfInterest
+
+
+# Saídas que processar_frame sabe produzir (params["outputs"] escolhe um subconjunto)
+ALL_OUTPUTS = frozenset(("img_resultado", "mask", "mask_clean", "circles"))
+# Gerações do BufferPool dos workers (0: as saídas publicadas são alocadas a cada frame)
+WORKER_POOL_GENERATIONS = 0
+
+
+@dataclass(frozen=True)
+class ProcessingResult:
+    """
+    Resultado imutável do processamento de um frame, publicado para a UI.
+    As saídas que não foram pedidas em params["outputs"] ficam a None.
+    """
+    frame_id: int
+    timestamp: float
+    img_resultado: np.ndarray
+    mask: np.ndarray
+    mask_clean: np.ndarray
+    circles: tuple          # ((x, y, r), ...) dos círculos com área > 50
+    circle_detected: bool
+
+
+# (ROI, tamanho do frame) já avisados como fora do frame (avisa uma vez, não a cada frame)
+_ROI_OUTSIDE_WARNED = set()
+
+
+def _roi_outside(crop):
+    """True se a ROI do perfil não interseta o frame (ex.: mudou a resolução)."""
+    roi, bounds, _ = crop
+    return bounds is None and not roi.is_empty()
+
+
+def _stage_crop(params, pool, image):
+    """
+    ROI do perfil: (roi, bounds do recorte ou None, frame a processar).
+    bounds None é o frame completo quando não há ROI; com uma ROI fora do
+    frame, as etapas seguintes não detetam nada (ver _roi_outside).
+    """
+    roi = RegionOfInterest(params.get("roi"))
+    bounds = None if roi.is_empty() else roi.bounds(image.shape)
+    if bounds is None:
+        if not roi.is_empty():
+            key = (roi.to_text(), image.shape[:2])
+            if key not in _ROI_OUTSIDE_WARNED:
+                _ROI_OUTSIDE_WARNED.add(key)
+                print(f"AVISO: a ROI ({key[0]}) está fora do frame {image.shape[1]}x{image.shape[0]}; nada será detetado")
+        return roi, None, image
+    x0, y0, x1, y1 = bounds
+    return roi, bounds, image[y0:y1, x0:x1]
+
+
+def _stage_context(params, pool, crop):
+    # O desfoque é aplicado uma vez (aqui, para o tempo ficar nesta etapa)
+    # e partilhado pelos planos HSV/cinza do frame
+    processor = ProcessImage(image=crop[2], blur=params["blur"], color_thresholds=params.get("color_thresholds"), pool=pool)
+    processor.context.blurred
+    return processor
+
+
+def _stage_mask(params, pool, crop, processor):
+    if _roi_outside(crop):
+        # Máscara vazia: círculos e objetos ficam vazios (não deteta fora da ROI)
+        return np.zeros(crop[2].shape[:2], dtype=np.uint8)
+    lower, upper = np.array([params["hsv_min"], params["hsv_max"]])
+    inverse = params["inverse_mask"]
+
+    seg_type = params["segmentation_type"]
+    if seg_type == "by_color":
+        mask = processor.create_mask_by_HSV(lower, upper, inverse)
+    elif seg_type == "by_limiar":
+        th_min, th_max = params["threshold"]
+        mask = processor.create_mask_by_threshold(th_min, th_max, inverse)
+    elif seg_type == "by_class":
+        mask = processor.create_mask_by_class(params.get("class_targets", ("red", "blue", "white")), inverse)
+    else:
+        # Fallback ou implementação futura para by_shape
+        mask = processor.create_mask_by_HSV(lower, upper, inverse)
+
+    roi, bounds, _ = crop
+    if bounds is not None and roi.needs_mask():
+        roi_mask = roi.crop_mask(bounds, out=processor._buffer("roi_mask", mask.shape))
+        mask = cv2.bitwise_and(mask, roi_mask, dst=mask)
+    return mask
+
+
+def _stage_mask_clean(params, pool, processor, mask):
+    return processor.remove_noise(mask)
+
+
+def _stage_circles(params, pool, crop, processor, mask_clean):
+    """Círculos com área > 50, já no referencial do frame completo."""
+    dp, min_dist, param1, param2, min_radius, max_radius = (int(v) for v in params["circle_hough"])
+    # circle_engine: hough (em pirâmide se pyramid_levels > 0), contour ou hybrid
+    detected = processor.find_circles(mask_clean, params.get("circle_engine", "hough"),
+                                      int(params.get("pyramid_levels", 0)),
+                                      dp, min_dist, param1, param2, min_radius, max_radius,
+                                      params.get("min_circularity", 0.83))
+    bounds = crop[1]
+    x0, y0 = (0, 0) if bounds is None else bounds[:2]
+    circles = []
+    for circle in detected:
+        x, y, r = int(circle[0]) + x0, int(circle[1]) + y0, int(circle[2])
+        area = math.pi * (r ** 2)
+        if area > 50:
+            circles.append((x, y, r))
+    return tuple(circles)
+
+
+def _stage_objects(params, pool, crop, processor, mask_clean):
+    """
+    Objetos de objects_detection (lista de dicionários, com o centro no
+    referencial do frame completo) e as estatísticas de get_statistics.
+    Não é uma saída da UI: é usada pela inspeção em lote.
+    """
+    # O processor pode estar em cache: recomeça a numeração a cada execução
+    processor.objects = {}
+    processor.count_objects = 0
+    processor.objects_detection(mask_clean, color_stat=params.get("color_stat", "mean"))
+    bounds = crop[1]
+    x0, y0 = (0, 0) if bounds is None else bounds[:2]
+    objects = []
+    for obj_id, info in processor.objects.items():
+        cx, cy = info["center"]
+        objects.append(dict(info, id=obj_id, center=(cx + x0, cy + y0)))
+    return objects, processor.get_statistics()
+
+
+def _stage_result(params, pool, image, crop, processor, circles):
+    # O resultado recebe desenhos: é sempre uma cópia (nunca o frame original
+    # nem o plano desfocado, que pode estar em cache)
+    roi, bounds, _ = crop
+    buffer = processor._buffer
+    if bounds is None:
+        img_processar = _copy(processor.context.blurred, buffer("result", image.shape, True))
+    else:
+        x0, y0, x1, y1 = bounds
+        img_processar = _copy(image, buffer("result", image.shape, True))
+        img_processar[y0:y1, x0:x1] = processor.context.blurred
+        roi.draw(img_processar)
+    for x, y, r in circles:
+        cv2.circle(img_processar, (x, y), r, (0, 255, 0), 2)
+    if _roi_outside(crop):
+        cv2.putText(img_processar, "ROI fora do frame", (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
+    return img_processar
+
+
+def _stage_mask_out(params, pool, image, crop, processor, mask):
+    """Máscara no referencial do frame completo (igual à do recorte sem ROI)."""
+    bounds = crop[1]
+    if bounds is None:
+        return mask
+    return _to_full_frame(mask, image.shape, bounds, processor._buffer("mask_full", image.shape[:2], True))
+
+
+def _stage_mask_clean_out(params, pool, image, crop, processor, mask_clean):
+    bounds = crop[1]
+    if bounds is None:
+        return mask_clean
+    return _to_full_frame(mask_clean, image.shape, bounds, processor._buffer("mask_clean_full", image.shape[:2], True))
+
+
+# Grafo de etapas: nome -> (chaves de params, etapas a montante, função).
+# As chaves são as de um perfil do plc_config.json; "image" é o frame de entrada.
+STAGES = {
+    "crop": (("roi",), ("image",), _stage_crop),
+    "context": (("blur", "color_thresholds"), ("crop",), _stage_context),
+    "mask": (("segmentation_type", "hsv_min", "hsv_max", "threshold", "inverse_mask", "class_targets"),
+             ("crop", "context"), _stage_mask),
+    "mask_clean": ((), ("context", "mask"), _stage_mask_clean),
+    "circles": (("circle_hough", "circle_engine", "pyramid_levels", "min_circularity"),
+                ("crop", "context", "mask_clean"), _stage_circles),
+    "objects": (("color_stat",), ("crop", "context", "mask_clean"), _stage_objects),
+    "img_resultado": ((), ("image", "crop", "context", "circles"), _stage_result),
+    "mask_out": ((), ("image", "crop", "context", "mask"), _stage_mask_out),
+    "mask_clean_out": ((), ("image", "crop", "context", "mask_clean"), _stage_mask_clean_out),
+}
+
+# Etapas do grafo registadas no LatencyMonitor, com o nome da etapa de latência
+# ("contours" é medido dentro de ProcessImage.extract_object_features)
+MONITORED_STAGES = {
+    "context": "blur",
+    "mask": "mask",
+    "mask_clean": "morphology",
+    "circles": "circles",
+}
+
+# Etapa que produz cada saída de processar_frame
+OUTPUT_STAGES = {
+    "img_resultado": "img_resultado",
+    "mask": "mask_out",
+    "mask_clean": "mask_clean_out",
+    "circles": "circles",
+}
+
+
+def processar_frame(image, params, pool=None, graph=None):
+    """
+    Executa a cadeia completa de processamento sobre um frame.
+
+    `params` é um snapshot dos controlos da UI com as mesmas chaves de um
+    perfil do plc_config.json (blur, hsv_min, hsv_max, threshold, inverse_mask,
+    segmentation_type, circle_hough e, opcionalmente, color_thresholds,
+    class_targets, roi, pyramid_levels, circle_engine e min_circularity).
+    Não toca em nenhum widget do Tkinter, por isso pode
+    correr em qualquer thread.
+    Com uma ROI, todas as etapas correm só no recorte da ROI e as máscaras e
+    círculos são devolvidos no referencial do frame completo.
+    params["outputs"] (opcional, por omissão ALL_OUTPUTS) indica as saídas que
+    alguém vai consumir; as etapas só necessárias às outras são saltadas e as
+    saídas não pedidas são devolvidas como None. A imagem de resultado leva
+    os círculos desenhados, por isso pedi-la calcula também os círculos.
+    Com um BufferPool (um por thread), todas as etapas escrevem em buffers
+    reutilizados; as saídas ficam válidas até o pool dar a volta às gerações.
+    Com um StageGraph(STAGES) reutilizado entre chamadas (ex.: imagem
+    congelada), só se recalculam as etapas cujos params ou entradas mudaram.
+    Retorna (img_resultado, mask, mask_clean, circles).
+    """
+    outputs = params.get("outputs", ALL_OUTPUTS)
+    if graph is None:
+        graph = StageGraph(STAGES)
+    values = graph.run(image, params, [OUTPUT_STAGES[name] for name in OUTPUT_STAGES if name in outputs], pool)
+    monitor = LatencyMonitor()
+    if monitor.enabled:
+        for stage, seconds in graph.timings.items():
+            if stage in MONITORED_STAGES:
+                monitor.record(MONITORED_STAGES[stage], seconds)
+    return tuple(values.get(OUTPUT_STAGES[name]) for name in ("img_resultado", "mask", "mask_clean", "circles"))
+
+
+def _to_full_frame(crop_mask, frame_shape, bounds, out=None):
+    """Coloca uma máscara do recorte da ROI numa máscara do tamanho do frame."""
+    x0, y0, x1, y1 = bounds
+    if out is None:
+        full = np.zeros(frame_shape[:2], dtype=crop_mask.dtype)
+    else:
+        full = out
+        full.fill(0)
+    full[y0:y1, x0:x1] = crop_mask
+    return full
+
+
+def _copy(image, out=None):
+    if out is None:
+        return image.copy()
+    np.copyto(out, image)
+    return out
+
+
+class ProcessingPipeline:
+    """
+    Pool de threads que consome frames e publica ProcessingResult numa fila.
+
+    As funções do OpenCV libertam o GIL, por isso várias threads usam vários
+    núcleos. A fila de entrada é limitada a `max_pending` frames: quando está
+    cheia, o frame pendente mais antigo é descartado (o mais recente ganha),
+    para o atraso nunca crescer quando o processamento fica para trás.
+    """
+    def __init__(self, workers=None, max_pending=2, max_results=4):
+        self.workers = workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.running = False
+        self._pending = deque(maxlen=max_pending)
+        self._cond = threading.Condition()
+        self._threads = []
+        self.results = queue.Queue(maxsize=max_results)
+        self.stats = {'submitted': 0, 'dropped': 0, 'processed': 0, 'errors': 0}
+
+    def start(self):
+        if self.running:
+            return
+        self.get_results()  # Descarta resultados de uma execução anterior
+        self.running = True
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(self.workers)]
+        for t in self._threads:
+            t.start()
+
+    def stop(self):
+        with self._cond:
+            self.running = False
+            self._pending.clear()
+            self._cond.notify_all()
+        for t in self._threads:
+            t.join(2.0)
+        self._threads = []
+
+    def submit(self, captured, params):
+        """Enfileira um CapturedFrame com o snapshot de parâmetros a usar."""
+        with self._cond:
+            if len(self._pending) == self._pending.maxlen:
+                # Política de descarte: sai o frame pendente mais antigo
+                self.stats['dropped'] += 1
+            self._pending.append((captured, params))
+            self.stats['submitted'] += 1
+            self._cond.notify()
+
+    def get_results(self):
+        """Drena a fila de resultados (chamado na thread do Tkinter)."""
+        results = []
+        while True:
+            try:
+                results.append(self.results.get_nowait())
+            except queue.Empty:
+                return results
+
+    def _publish(self, result):
+        while True:
+            try:
+                self.results.put_nowait(result)
+                return
+            except queue.Full:
+                # A UI não drenou a tempo: descarta o resultado mais antigo
+                try:
+                    self.results.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def _worker(self):
+        # Buffers próprios do worker, só para os intermédios (HSV, cinza, índices
+        # da LUT, ...): reutilizar as saídas publicadas não ganhava tempo e
+        # retinha várias gerações de planos do tamanho do frame
+        pool = BufferPool(generations=WORKER_POOL_GENERATIONS)
+        graph = StageGraph(STAGES)
+        while True:
+            with self._cond:
+                while self.running and not self._pending:
+                    self._cond.wait()
+                if not self.running:
+                    return
+                captured, params = self._pending.popleft()
+
+            try:
+                pool.next_generation()
+                img_resultado, mask, mask_clean, circles = processar_frame(captured.image, params, pool, graph)
+            except Exception as e:
+                with self._cond:
+                    self.stats['errors'] += 1
+                print(f"Erro no pipeline de processamento: {e}")
+                continue
+
+            self._publish(ProcessingResult(
+                frame_id=captured.frame_id,
+                timestamp=captured.timestamp,
+                img_resultado=img_resultado,
+                mask=mask,
+                mask_clean=mask_clean,
+                circles=circles,
+                circle_detected=bool(circles)
+            ))
+            with self._cond:
+                self.stats['processed'] += 1
@@ -1,41 +1,114 @@
 import asyncio
 import threading
+import time
+from datetime import timezone
 from asyncua import Client, ua
+from src.model.LatencyMonitor import LatencyMonitor
 from src.model.OpcuaDTO import OpcuaDTO
 
+def source_timestamp(data):
+    """
+    SourceTimestamp de uma notificação em segundos (time.time()), ou None.
+    Sem SourceTimestamp (ex.: valor escrito por um cliente), usa o ServerTimestamp.
+    """
+    try:
+        value = data.monitored_item.Value
+        ts = value.SourceTimestamp or value.ServerTimestamp
+    except AttributeError:
+        return None
+    if ts is None:
+        return None
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=timezone.utc)  # O OPC UA usa sempre UTC
+    return ts.timestamp()
+
 class SubHandler:
     """
     Handler para receber eventos de mudança de dados do OPC UA.
+
+    O encaminhamento é feito por um índice montado ao subscrever: cada item
+    monitorado tem uma rota [node_id, callbacks] indexada pelo handle do item
+    no servidor (o que subscribe_data_change retorna) e, enquanto esse handle
+    não é conhecido, pelo NodeId. Por notificação há só uma consulta ao dict,
+    sem formatar strings nem percorrer a lista de subscrições. Notificações
+    sem rota são contadas em `unmatched`. Cada rota conta as subscrições que
+    a usam; a última a sair (remove_route) liberta o item monitorado.
     """
-    def __init__(self, subscriptions):
-        self.subscriptions = subscriptions
+    def __init__(self):
+        self.routes = {}       # handle do item no servidor -> rota
+        self._by_nodeid = {}   # ua.NodeId -> rota
+        self._handles = {}     # ua.NodeId -> handle do item no servidor
+        self._refs = {}        # ua.NodeId -> número de subscrições
+        self._members = {}     # id(subscrição) -> (subscrição, ua.NodeId)
+        self.unmatched = 0
+        self._dto = OpcuaDTO()
+
+    def add_route(self, nodeid, target_id, sub):
+        """
+        Junta a subscrição (dict do SharedPLC) à rota do NodeId. Retorna True
+        se a rota é nova (é preciso criar o item monitorado), False se o nó
+        já é monitorado.
+        """
+        route = self._by_nodeid.get(nodeid)
+        created = route is None
+        if created:
+            route = self._by_nodeid[nodeid] = [target_id, ()]
+        if sub['callback']:
+            route[1] += (sub['callback'],)
+        self._refs[nodeid] = self._refs.get(nodeid, 0) + 1
+        self._members[id(sub)] = (sub, nodeid)
+        return created
+
+    def bind(self, handle, nodeid):
+        """
+        Indexa a rota do NodeId pelo handle do item monitorado. Retorna False
+        se a rota já foi removida entretanto (o item deve ser cancelado).
+        """
+        route = self._by_nodeid.get(nodeid)
+        if route is None:
+            return False
+        self.routes[handle] = route
+        self._handles[nodeid] = handle
+        return True
+
+    def remove_route(self, sub):
+        """
+        Retira a subscrição da sua rota. Retorna o handle do item monitorado a
+        cancelar quando era a última do nó, senão None (também se a subscrição
+        nunca chegou a ter rota).
+        """
+        member = self._members.pop(id(sub), None)
+        if member is None:
+            return None
+        nodeid, callback = member[1], sub['callback']
+        route = self._by_nodeid[nodeid]
+        if callback in route[1]:
+            callbacks = list(route[1])
+            callbacks.remove(callback)
+            route[1] = tuple(callbacks)
+        self._refs[nodeid] -= 1
+        if self._refs[nodeid] > 0:
+            return None
+        del self._by_nodeid[nodeid], self._refs[nodeid]
+        handle = self._handles.pop(nodeid, None)
+        self.routes.pop(handle, None)
+        return handle
 
     def datachange_notification(self, node, val, data):
         try:
-            # Obtém os componentes do NodeId diretamente para comparação segura
-            ns_idx = node.nodeid.NamespaceIndex
-            ident = node.nodeid.Identifier
-            
+            route = self.routes.get(data.subscription_data.server_handle)
+            if route is None:
+                # Notificação antes de subscribe_data_change retornar
+                route = self._by_nodeid.get(node.nodeid)
+                if route is None:
+                    self.unmatched += 1
+                    return
+            target_id, callbacks = route
+
             # Atualiza o DTO (Fonte única de verdade)
-            target_id = f"ns={ns_idx};s={ident}"
-            OpcuaDTO().set_variable(target_id, val)
-            
-            # Debug: Mostra o que chegou do PLC
-            # print(f"[SharedPLC] Notificação: ns={ns_idx}, id={ident}, val={val}")
-            
-            # Itera sobre as subscrições para encontrar a correspondente
-            found = False
-            for sub in self.subscriptions:
-                # Compara Namespace e Nome (converte para string para garantir igualdade)
-                if str(sub['ns']) == str(ns_idx) and str(sub['name']) == str(ident):
-                    found = True
-                    if sub['callback']:
-                        # Reconstrói o NodeID esperado pela UI para garantir que a chave do dicionário bata
-                        target_id = f"ns={sub['ns']};s={sub['name']}"
-                        sub['callback'](target_id, val)
-            
-            if not found:
-                print(f"[SharedPLC] AVISO: Nenhuma subscrição encontrada para ns={ns_idx}, id={ident}")
+            self._dto.set_variable(target_id, val, source_timestamp(data))
+            for callback in callbacks:
+                callback(target_id, val)
         except Exception as e:
             print(f"Erro no callback OPC UA: {e}")
 
@@ -54,6 +127,7 @@ class SharedPLC:
         self._thread = None
         self._client = None
         self._sub_obj = None
+        self._handler = None
 
     def set_log_callback(self, cb):
         self.log_callback = cb
@@ -84,10 +158,27 @@ class SharedPLC:
         if self.connected and self._loop and self._sub_obj:
              asyncio.run_coroutine_threadsafe(self._add_monitored_item(sub), self._loop)
 
-    def write(self, ns, name, value):
-        """Envia comando de escrita para a thread do PLC."""
+    def unsubscribe(self, ns, name, callback=None):
+        """Desfaz um subscribe(ns, name, callback); o nó deixa de ser monitorado sem subscrições."""
+        for sub in self._subscriptions:
+            if sub["ns"] == str(ns) and sub["name"] == name and sub["callback"] is callback:
+                self._subscriptions.remove(sub)
+                break
+        else:
+            return
+        if self.connected and self._loop and self._sub_obj:
+            asyncio.run_coroutine_threadsafe(self._remove_monitored_item(sub), self._loop)
+
+    def write(self, ns, name, value, timestamp=None):
+        """
+        Envia comando de escrita para a thread do PLC.
+        timestamp: instante de captura (time.perf_counter) do frame que originou
+        a escrita; a latência frame -> escrita concluída vai para o LatencyMonitor
+        ("end_to_end"). Retorna o Future da escrita (None se desconectado).
+        """
         if self.connected and self._loop:
-            asyncio.run_coroutine_threadsafe(self._write_value(ns, name, value), self._loop)
+            return asyncio.run_coroutine_threadsafe(self._write_value(ns, name, value, timestamp), self._loop)
+        return None
 
     def _thread_run(self):
         self._loop = asyncio.new_event_loop()
@@ -104,9 +195,9 @@ class SharedPLC:
                     self.connected = True
                     self.log_callback("Conectado ao PLC.")
                     
-                    # Cria a subscrição
-                    handler = SubHandler(self._subscriptions)
-                    self._sub_obj = await client.create_subscription(500, handler)
+                    # Cria a subscrição (rotas refeitas a cada ligação)
+                    self._handler = SubHandler()
+                    self._sub_obj = await client.create_subscription(500, self._handler)
                     
                     # Adiciona itens já registrados
                     for sub in self._subscriptions:
@@ -125,17 +216,34 @@ class SharedPLC:
             node_id = f"ns={sub['ns']};s={sub['name']}"
             node = self._client.get_node(node_id)
             await node.read_value() # Verifica se existe
-            await self._sub_obj.subscribe_data_change(node)
+            if not any(s is sub for s in self._subscriptions):
+                return  # Cancelada enquanto se verificava o nó
+            if not self._handler.add_route(node.nodeid, node_id, sub):
+                return  # Nó já monitorado: só ganhou mais um callback
+            handle = await self._sub_obj.subscribe_data_change(node)
+            if not self._handler.bind(handle, node.nodeid):
+                await self._sub_obj.unsubscribe(handle)
         except Exception as e:
             self.log_callback(f"Falha ao subscrever {sub['name']}: {e}")
 
-    async def _write_value(self, ns, name, value):
+    async def _remove_monitored_item(self, sub):
+        try:
+            handle = self._handler.remove_route(sub)
+            if handle is not None:
+                await self._sub_obj.unsubscribe(handle)
+        except Exception as e:
+            self.log_callback(f"Falha ao cancelar {sub['name']}: {e}")
+
+    async def _write_value(self, ns, name, value, timestamp=None):
         try:
             node_id = f"ns={ns};s={name}"
             node = self._client.get_node(node_id)
             # Força tipo Boolean conforme uso no projeto
             dv = ua.DataValue(ua.Variant(value, ua.VariantType.Boolean))
             await node.write_attribute(ua.AttributeIds.Value, dv)
+            if timestamp is not None:
+                # Escrita confirmada pelo servidor: fecha a medição captura -> PLC
+                LatencyMonitor().record("end_to_end", time.perf_counter() - timestamp)
             self.log_callback(f"Escrito {value} em {name}")
         except Exception as e:
             self.log_callback(f"Falha ao escrever em {name}: {e}")
\ No newline at end of file
@@ -0,0 +1,60 @@
+import copy
+import time
+
+
+class StageGraph:
+    """
+    Avaliador memoizado de uma cadeia de etapas (grafo acíclico).
+
+    Cada etapa é declarada como nome -> (chaves de params, etapas a montante, função).
+    A função recebe (params, pool, *valores a montante) e devolve o valor da
+    etapa. O nome especial "image" é a imagem de entrada.
+
+    O valor de cada etapa fica em cache com a sua chave: os valores dos seus
+    params e as versões das etapas a montante. Numa nova execução só se
+    recalcula a etapa cujos params mudaram e tudo o que está a jusante dela;
+    as etapas não pedidas (e que nada pedido precisa) nem são avaliadas.
+    `timings` guarda o tempo (s) das etapas calculadas na última execução.
+    """
+    def __init__(self, stages):
+        self.stages = stages
+        self._cache = {}      # etapa -> (chave, valor, versão)
+        self._image = None
+        self._image_version = 0
+        self._versions = 0
+        self.timings = {}
+
+    def clear(self):
+        self._cache.clear()
+        self._image = None
+
+    def run(self, image, params, targets, pool=None):
+        """Devolve {etapa: valor} para as etapas em targets."""
+        if image is not self._image:
+            self._image = image
+            self._versions += 1
+            self._image_version = self._versions
+        self.timings = {}
+        return {name: self._evaluate(name, params, pool)[0] for name in targets}
+
+    def _evaluate(self, name, params, pool):
+        """Retorna (valor, versão) da etapa, recalculando-a só se a chave mudou."""
+        if name == "image":
+            return self._image, self._image_version
+
+        keys, upstream, fn = self.stages[name]
+        inputs = [self._evaluate(dep, params, pool) for dep in upstream]
+        key = (tuple(params.get(k) for k in keys), tuple(v for _, v in inputs))
+
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == key:
+            return cached[1], cached[2]
+
+        t0 = time.perf_counter()
+        value = fn(params, pool, *(v for v, _ in inputs))
+        self.timings[name] = time.perf_counter() - t0
+
+        self._versions += 1
+        # Cópia da chave: listas do perfil (ex.: roi) podem ser alteradas depois
+        self._cache[name] = (copy.deepcopy(key), value, self._versions)
+        return value, self._versions
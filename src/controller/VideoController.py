@@ -1,10 +1,21 @@
-import cv2
-import math
-import numpy as np
 import json
+import time
+from collections import deque
 
-from src.model.OpcuaDTO import OpcuaDTO
-from .util.ProcessImage import ProcessImage
+from src.model.LatencyMonitor import LatencyMonitor
+from .FrameGrabber import FrameGrabber
+from .PLCHandshake import PLCHandshake
+from .ProcessingPipeline import STAGES, ProcessingPipeline, ProcessingResult, processar_frame
+from .StageGraph import StageGraph
+from .EventCoalescer import EventCoalescer
+from .util.BufferPool import BufferPool
+from .util.MotionGate import DEFAULT_MOTION_THRESHOLD, MotionGate
+from .util.ObjectTracker import ObjectTracker, detections_from_circles
+
+# Tempo (s) que o resultado de uma inspeção por borda fica no ecrã antes de voltar ao vídeo
+INSPECTION_HOLD_S = 1.0
+# Período (ms) de verificação dos prazos do handshake do PLC
+HANDSHAKE_TICK_MS = 10
 
 
 class VideoController:
@@ -12,23 +23,49 @@ class VideoController:
     Classe responsável pela lógica de controle do vídeo, estados e processamento.
     Separa a lógica de negócio da interface gráfica (View).
     """
-    def __init__(self, view, cap):
+    def __init__(self, view, cap, source_name="0"):
         self.view = view  # Referência para a GUI (PaginaVideo) para ler sliders e atualizar imagem
         self.cap = cap    # Objeto VideoCapture do OpenCV
+        # Captura em thread dedicada: o loop do Tkinter só consome o frame mais recente
+        self.grabber = FrameGrabber(cap, source_name)
+        # Pool de workers que executa a cadeia OpenCV fora da thread do Tkinter
+        self.pipeline = ProcessingPipeline()
+        self.last_result_id = -1
+        # Buffers do processamento síncrono (modo estático), só usados na thread do Tkinter
+        self.static_pool = BufferPool(generations=2)
+        # Cache das etapas da imagem congelada: mexer num slider só recalcula
+        # a etapa afetada e as que estão a jusante (tempos em static_graph.timings)
+        self.static_graph = StageGraph(STAGES)
+        # Eventos dos controlos em modo estático: um processamento em curso + um pendente
+        self.coalescer = EventCoalescer(view, self._static_snapshot, self._static_job, self._static_done)
+        # Latência por etapa (desligada por omissão; ligada no painel da PaginaVideo)
+        self.monitor = LatencyMonitor()
+        # Segue as peças entre frames do vídeo: contador e PLC só contam peças novas
+        self.tracker = ObjectTracker()
+        self.parts_to_signal = set()  # IDs de peças novas ainda não sinalizadas ao PLC
+        # Cena parada (entre peças) com os mesmos parâmetros: não reprocessa o frame
+        self.motion_gate = MotionGate()
+        self.last_params = None
+        # Modo trigger por borda: cada borda de subida do trigger inspeciona um único frame
+        self.edge_mode = False
+        self._pending_edges = deque()  # (instante, frame do histórico ou None) das bordas por inspecionar
+        self._hold_until = 0.0
+        self.edge_stats = {'edges': 0, 'inspections': 0}
+        # Handshake trigger -> inspeção -> sinal, conduzido pelos eventos do OpcuaDTO
+        self.handshake = PLCHandshake(self._write_signal, self._on_trigger)
+        self._subscribed_nodes = {}  # node_id -> (ns, nome) subscritos para o handshake
         
         # Variáveis de Estado
         self.sending_plc = False # Flag para evitar envios sobrepostos
         self.imagem_congelada = None 
         self.modo_estatico = False
         self.running = False
-        self.circle_detected = False
-        self.msg_sent_to_plc = False
-        self.fps = 0
-        self.read_errors = 0
+        self.result_timestamp = None
         
         # Cache da configuração do PLC para evitar leitura de disco constante
         self.plc_config = {}
         self.load_plc_config()
+        self.view.after(HANDSHAKE_TICK_MS, self._tick_handshake)
 
     def load_plc_config(self):
         try:
@@ -37,144 +74,321 @@ class VideoController:
         except Exception as e:
             print(f"Erro ao carregar config PLC: {e}")
             self.plc_config = {}
+        self.handshake.configure(self.plc_config.get("handshake"))
+
+    def set_capture(self, cap, source_name):
+        """Troca a fonte de vídeo (chamado por PaginaFile ao aplicar a câmera)."""
+        self.cap = cap
+        self.grabber.set_source(cap, source_name)
+        self.reset_tracking()
+        self.motion_gate.reset()
 
     def iniciar(self):
         self.load_plc_config() # Recarrega caso tenha mudado noutra tela
+        self.aplicar_trigger() # O sinal do handshake pode ter mudado com a configuração
         if not self.running and not self.modo_estatico:
             self.running = True
+            self.last_result_id = -1
+            self.reset_tracking()
+            self.motion_gate.reset()
+            self.pipeline.start()
+            self.grabber.start()
             self.loop()
 
+    def reset_tracking(self):
+        """Esquece as trilhas (nova fonte ou vídeo reiniciado); o contador recomeça."""
+        self.tracker.reset()
+        self.parts_to_signal.clear()
+
     def parar(self):
         self.running = False
+        self.grabber.stop()
+        self.pipeline.stop()
 
     def get_image(self):
         """Captura a frame atual, para o vídeo e processa."""
-        if self.cap.isOpened():
+        captured = self.grabber.peek_latest()
+        if captured is not None:
+            frame = captured.image
+        elif self.cap.isOpened():
             ret, frame = self.cap.read()
-            if ret:
-                self.imagem_congelada = frame
-                self.modo_estatico = True
-                self.running = False # Para o loop de vídeo
-                self.atualizar_processamento() # Processa a imagem congelada
+            if not ret:
+                return
+        else:
+            return
+
+        self.imagem_congelada = frame
+        self.modo_estatico = True
+        self.parar() # Para o loop de vídeo e a thread de captura
+        self.atualizar_processamento() # Processa a imagem congelada
 
     def clean_image(self):
         """Limpa a imagem congelada e retoma o vídeo."""
         self.modo_estatico = False
         self.imagem_congelada = None
+        self.coalescer.cancel()
+        if not self.coalescer.busy():
+            self.static_graph.clear()
         self.view.var_pecas_detectadas.set("0")
-        self.view.lbl_video.configure(image="") # Limpa visualmente
+        self.view.renderer.clear() # Limpa visualmente
         self.iniciar() # Reinicia o loop
 
     def loop(self):
         if not self.running or self.modo_estatico:
             return
 
-        ret, frame = self.cap.read()
-        if ret:
-            self.read_errors = 0
-            # Mostra o frame cru (ou processado se quiséssemos live processing)
-            # Aqui, conforme lógica original, mostramos o frame e processamos em background/overlay
-            self.view.mostrar_imagem_no_label(frame)
-            self.atualizar_processamento(frame)
-        else:
-            self.read_errors += 1
-            if self.read_errors > 5:
-                # Se falhar consecutivamente, desacelera o loop para evitar spam de log e alto uso de CPU
-                self.view.after(500, self.loop)
-                return
-        
-        if self.fps <= 50:
-            self.fps += 1
-        else:
-            self.fps = 0
-            self.msg_sent_to_plc = False
+        self.edge_mode = self.view.var_mode_trigger.get() and self.view.var_trigger_edge.get()
+        if not self.edge_mode:
+            self._pending_edges.clear()
+
+        # Nunca bloqueia: pega apenas o frame mais recente produzido pela thread de captura
+        captured = self.grabber.get_latest()
+        if self.edge_mode:
+            self._inspecionar_na_borda(captured)
+        elif captured is not None:
+            params = self.snapshot_params()
+            self.motion_gate.threshold = params.get("motion_threshold", DEFAULT_MOTION_THRESHOLD)
+            if self.motion_gate.should_process(captured.image, force=params != self.last_params):
+                # O processamento corre no pool de workers; aqui só enviamos o frame
+                self.last_params = params
+                self.pipeline.submit(captured, params)
+            else:
+                # Nada mudou: o último resultado continua válido, mas o trigger é atendido na mesma
+                self._process_plc_logic(bool(self.parts_to_signal))
+        if captured is None and self.grabber.read_errors > 5:
+            # Se a câmera falhar consecutivamente, desacelera o loop para poupar CPU
+            self.view.after(500, self.loop)
+            return
+
+        # Aplica na UI o resultado mais recente publicado pelos workers
+        results = self.pipeline.get_results()
+        if results and self.edge_mode:
+            # Cada resultado é uma inspeção (o frame do histórico pode ser anterior ao último mostrado)
+            for result in sorted(results, key=lambda r: r.frame_id):
+                self.last_result_id = max(self.last_result_id, result.frame_id)
+                self.aplicar_resultado(result)
+                self.grabber.mark_processed()
+        elif results:
+            newest = max(results, key=lambda r: r.frame_id)
+            if newest.frame_id > self.last_result_id:
+                self.last_result_id = newest.frame_id
+                self.aplicar_resultado(newest)
+                self.grabber.mark_processed()
 
         self.view.after(15, self.loop)
 
-    def atualizar_processamento(self, image=None):
-        if self.imagem_congelada is None and image is None:
+    def _tick_handshake(self):
+        """Prazos do handshake do PLC: corre sempre, independente do vídeo e do fps."""
+        self.handshake.enabled = self.view.var_mode_trigger.get()
+        self.handshake.tick()
+        self.view.after(HANDSHAKE_TICK_MS, self._tick_handshake)
+
+    def aplicar_trigger(self):
+        """
+        Confirma a variável do trigger (Enter ou saída do campo "Var Name", ou
+        ao ligar o modo trigger): muda o nó do handshake e, com o modo trigger
+        ligado, as subscrições no SharedPLC.
+        """
+        name = self.view.var_trigger_name.get().strip()
+        if name:
+            self.handshake.set_trigger_node(f"ns=4;s={name}")
+        if self.view.var_mode_trigger.get():
+            self._subscribe_handshake_nodes()
+
+    def _subscribe_handshake_nodes(self):
+        """
+        Subscreve no SharedPLC o trigger e o sinal do handshake, sem depender
+        da página de Status (subscrições repetidas do mesmo nó partilham o
+        item), e cancela as dos nós que deixaram de ser usados.
+        """
+        shared = self.view.controller.shared_plc
+        wanted = {f"ns={ns};s={name}": (ns, name) for ns, name in self.handshake.nodes()}
+        for node_id in list(self._subscribed_nodes):
+            if node_id not in wanted:
+                shared.unsubscribe(*self._subscribed_nodes.pop(node_id), None)
+        for node_id, (ns, name) in wanted.items():
+            if node_id not in self._subscribed_nodes:
+                self._subscribed_nodes[node_id] = (ns, name)
+                shared.subscribe(ns, name, None)
+
+    def _on_trigger(self, source_ts):
+        """
+        Borda de subida do trigger (thread do PLC, via PLCHandshake).
+        No modo por borda, com o SourceTimestamp da mudança, procura logo no
+        histórico do FrameGrabber o frame capturado nesse instante (a
+        notificação chega atrasada).
+        """
+        if not self.edge_mode:
             return
-        elif image is not None:
-            img_processar = image
-        else:
-            img_processar = self.imagem_congelada.copy()
+        frame = self.grabber.find_frame(source_ts) if source_ts is not None else None
+        self._pending_edges.append((time.perf_counter(), frame))
 
-        # Acessa configurações da View
-        blur_val = int(self.view.slider_blur.get())
-        if blur_val % 2 == 0: blur_val += 1
-        if blur_val > 1:
-            img_processar = cv2.GaussianBlur(img_processar, (blur_val, blur_val), 0)
-        
-        processor = ProcessImage(image=img_processar)
+    def _inspecionar_na_borda(self, captured):
+        """
+        Modo trigger por borda: cada borda de subida manda um único frame para
+        o pipeline: o do histórico mais próximo do instante do trigger ou, sem
+        ele (miss), o primeiro capturado depois da notificação. Os outros
+        frames só são exibidos.
+        """
+        if self._pending_edges:
+            edge_at, frame = self._pending_edges[0]
+            if frame is None and captured is not None and captured.timestamp >= edge_at:
+                frame = captured
+            if frame is not None:
+                self._pending_edges.popleft()
+                self.edge_stats['edges'] += 1
+                self.pipeline.submit(frame, self.snapshot_params())
+                return
+        if captured is not None and time.perf_counter() >= self._hold_until:
+            self.view.mostrar_imagem_no_label(captured.image)
 
-        lower, upper = np.array([(self.view.slider_Hue_min.get(), self.view.slider_Sat_min.get(), self.view.slider_Value_min.get()),
-                                 (self.view.slider_Hue_max.get(), self.view.slider_Sat_max.get(), self.view.slider_Value_max.get())])
-        
-        seg_type = self.view.var_type_of_segmentation.get()
-        if seg_type == "by_color":
-            mask = processor.create_mask_by_HSV(lower, upper, self.view.check_inverseMask.get())
-        elif seg_type == "by_limiar":
-            mask = processor.create_mask_by_threshold(self.view.slider_threshold_min.get(), self.view.slider_threshold_max.get(), self.view.check_inverseMask.get())
-        else:
-            # Fallback ou implementação futura para by_shape
-            mask = processor.create_mask_by_HSV(lower, upper, self.view.check_inverseMask.get())
-        
-        mask_clean = processor.remove_noise(mask)
-        contours, hierarchy = processor.get_contours(mask_clean)
-        
-        circles = processor.get_circles(mask_clean, 
-                                        int(self.view.slider_circle_dp.get()), 
-                                        int(self.view.slider_circle_min_dist.get()),
-                                        int(self.view.slider_circle_param1.get()),
-                                        int(self.view.slider_circle_param2.get()),
-                                        int(self.view.slider_circle_min_radius.get()), 
-                                        int(self.view.slider_circle_max_radius.get()))
-        
-        if len(circles) > 0:
-            for circle in circles:
-                x, y, r = int(circle[0]), int(circle[1]), int(circle[2])
-                area = math.pi * (r ** 2)
-                if area > 50:
-                    self.view.var_pecas_detectadas.set(str(len(circles)))
-                    img_processar = cv2.circle(img_processar, (x, y), r, (0, 255, 0), 2)
-                    self.circle_detected = True
+    def snapshot_params(self):
+        """
+        Lê os controlos da View (só pode ser chamado na thread do Tkinter).
+        As chaves são as mesmas de um perfil gravado em plc_config.json.
+        """
+        params = dict(self.view.profile_options)
+        params.update({
+            "hsv_min": (self.view.slider_Hue_min.get(), self.view.slider_Sat_min.get(), self.view.slider_Value_min.get()),
+            "hsv_max": (self.view.slider_Hue_max.get(), self.view.slider_Sat_max.get(), self.view.slider_Value_max.get()),
+            "threshold": (self.view.slider_threshold_min.get(), self.view.slider_threshold_max.get()),
+            "blur": self.view.slider_blur.get(),
+            "inverse_mask": self.view.check_inverseMask.get(),
+            "segmentation_type": self.view.var_type_of_segmentation.get(),
+            "circle_hough": (
+                self.view.slider_circle_dp.get(),
+                self.view.slider_circle_min_dist.get(),
+                self.view.slider_circle_param1.get(),
+                self.view.slider_circle_param2.get(),
+                self.view.slider_circle_min_radius.get(),
+                self.view.slider_circle_max_radius.get()
+            ),
+            "pyramid_levels": int(round(self.view.slider_pyramid_levels.get())),
+            "circle_engine": self.view.var_circle_engine.get(),
+            "outputs": self.required_outputs()
+        })
+        return params
+
+    def required_outputs(self):
+        """
+        Saídas do pipeline que alguém vai consumir: a imagem do "View Type"
+        selecionado e, com o modo trigger ligado, os círculos para o PLC.
+        Sem imagem congelada, a vista "Original Frozen" mostra o resultado.
+        """
+        tipo = self.view.var_imagem_tipo.get()
+        outputs = set()
+        if tipo == "img_resultado" or (tipo == "imagem_congelada" and self.imagem_congelada is None):
+            outputs.update(("img_resultado", "circles"))  # O resultado mostra os círculos desenhados
+        elif tipo in ("mask", "mask_clean"):
+            outputs.add(tipo)
+        if self.view.var_mode_trigger.get():
+            outputs.add("circles")
+        return frozenset(outputs)
+
+    def atualizar_processamento(self):
+        """
+        Pede o (re)processamento da imagem congelada (modo estático).
+        O processamento corre em segundo plano; rajadas de pedidos (ex.: arrastar
+        um slider) juntam-se num só, sempre com os parâmetros mais recentes.
+        """
+        if self.modo_estatico and self.imagem_congelada is not None:
+            self.coalescer.request()
+
+    def _static_snapshot(self):
+        """Imagem e parâmetros do próximo processamento (thread do Tkinter)."""
+        if not self.modo_estatico or self.imagem_congelada is None:
+            return None
+        return self.imagem_congelada, self.snapshot_params()
+
+    def _static_job(self, payload):
+        """Processa a imagem congelada na thread do EventCoalescer (um trabalho de cada vez)."""
+        image, params = payload
+        self.static_pool.next_generation()
+        return processar_frame(image, params, self.static_pool, self.static_graph)
+
+    def _static_done(self, outputs):
+        if not self.modo_estatico:
+            return
+        img_resultado, mask, mask_clean, circles = outputs
+        self.aplicar_resultado(ProcessingResult(
+            frame_id=-1,
+            timestamp=0.0,
+            img_resultado=img_resultado,
+            mask=mask,
+            mask_clean=mask_clean,
+            circles=circles,
+            circle_detected=bool(circles)
+        ))
+
+    def aplicar_resultado(self, result):
+        """
+        Atualiza contador, lógica PLC e visualização a partir de um ProcessingResult.
+        Se os círculos não foram pedidos (ex.: vista de máscara sem trigger), o
+        contador mantém o último valor.
+        No vídeo, os círculos passam pelo ObjectTracker: o contador é o total de
+        peças distintas e o PLC só é sinalizado uma vez por peça nova.
+        """
+        force = self.modo_estatico
+        if self.edge_mode and result.frame_id >= 0:
+            # Inspeção de uma borda do trigger: mostra o resultado durante INSPECTION_HOLD_S
+            self.edge_stats['inspections'] += 1
+            self._hold_until = time.perf_counter() + INSPECTION_HOLD_S
+            if result.circles:
+                self.view.var_pecas_detectadas.set(str(len(result.circles)))
+            detected, final = result.circle_detected, True  # A inspeção desta borda decide o ciclo
+            # O frame cru mostrado há instantes não pode fazer o limite de fps descartar a inspeção
+            force = True
+        elif result.frame_id >= 0 and result.circles is not None:
+            # Sem frame_id: o tracker avança um passo por resultado processado. Os ids de
+            # captura saltam os frames que o MotionGate ignorou e a previsão pela
+            # velocidade atiraria uma peça que parou para fora de max_distance
+            _, events = self.tracker.update(detections_from_circles(result.circles))
+            for kind, track_id in events:
+                if kind == "new":
+                    self.parts_to_signal.add(track_id)
+                else:
+                    self.parts_to_signal.discard(track_id)
+            self.view.var_pecas_detectadas.set(str(self.tracker.total))
+            detected, final = bool(self.parts_to_signal), False
         else:
-            self.circle_detected = False
+            if result.circles:
+                self.view.var_pecas_detectadas.set(str(len(result.circles)))
+            detected, final = result.circle_detected, False
+        # Instante de captura do frame (None para a imagem congelada), levado até à escrita no PLC
+        self.result_timestamp = result.timestamp if result.frame_id >= 0 else None
 
-        self._process_plc_logic()
+        t0 = self.monitor.start()
+        self._process_plc_logic(detected, final)
+        self.monitor.stop("plc", t0)
 
         # Decide qual imagem mostrar baseado na seleção da View
-        self.view.atualizar_visualizacao_final(img_processar, mask, mask_clean, self.imagem_congelada)
+        # (em modo estático e nas inspeções por borda mostra sempre, sem o limite de fps da exibição)
+        self.view.atualizar_visualizacao_final(result.img_resultado, result.mask, result.mask_clean,
+                                               self.imagem_congelada, force=force)
+        if self.monitor.enabled and result.frame_id >= 0:
+            # Idade do frame desde a captura até estar no ecrã
+            self.monitor.record("frame_age", time.perf_counter() - result.timestamp)
 
-    def _process_plc_logic(self):
-        """Gerencia a lógica de interação com o PLC (Trigger e Sinais)."""
+    def _process_plc_logic(self, detected, final=False):
+        """
+        Entrega ao handshake do PLC o resultado de uma inspeção (modo trigger).
+        final: esta inspeção decide o ciclo (modo por borda); no vídeo contínuo,
+        sem peça, o handshake continua à espera até ao timeout.
+        """
         if not self.view.var_mode_trigger.get():
             return
+        if self.handshake.report_inspection(detected, self.result_timestamp, final):
+            self.parts_to_signal.clear()  # Peças presentes já sinalizadas
 
-        try:
-            # Recupera valores do DTO com segurança
-            trigger_node = f"ns=4;s={self.view.var_trigger_name.get()}"
-            signal_node = "ns=4;s=SinalPython"
-            
-            dto = OpcuaDTO()
-            trigger_active = dto.get_variable(trigger_node) if dto.isVariableSet(trigger_node) else False
-            signal_active = dto.get_variable(signal_node) if dto.isVariableSet(signal_node) else False
-
-            # Lógica de disparo
-            if self.circle_detected and not self.msg_sent_to_plc and trigger_active:
-                self.trigger_plc_signals(value=True)
-                print("Trigger PLC Enviado: TRUE")
-            
-            # Lógica de reset (pulso)
-            elif signal_active and self.msg_sent_to_plc:
-                self.trigger_plc_signals(value=False)
-                print("Trigger PLC Enviado: False")
-                
-        except Exception as e:
-            print(f"Erro no processamento PLC: {e}")
+    def _write_signal(self, value, timestamp):
+        """Escrita pedida pelo PLCHandshake (thread do Tkinter)."""
+        self.trigger_plc_signals([self.handshake.signal_name], value, timestamp)
 
-    def trigger_plc_signals(self, sgnals=None, value=True):
-        """Lê a configuração e envia sinal para o PLC."""
+    def trigger_plc_signals(self, sgnals=None, value=True, timestamp=None):
+        """
+        Lê a configuração e envia sinal para o PLC.
+        timestamp: instante de captura do frame que originou o sinal (latência ponta a ponta).
+        """
         if sgnals is None:
             sgnals = ["SinalPython"]
             
@@ -187,9 +401,8 @@ class VideoController:
             shared = self.view.controller.shared_plc
             for ns, name in variables:
                 if name in sgnals:
-                    shared.write(ns, name, value)
+                    shared.write(ns, name, value, timestamp)
                     # Envia True para as variáveis configuradas usando a conexão existente
-            self.msg_sent_to_plc = value
             
         finally:
             self.sending_plc = False
\ No newline at end of file
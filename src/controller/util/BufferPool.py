@@ -0,0 +1,54 @@
+import numpy as np
+
+
+class BufferPool:
+    """
+    Buffers numpy reutilizados entre frames, por (nome, forma, dtype).
+
+    Cada pool pertence a uma única thread (um por worker), por isso não usa lock.
+    Há dois tipos de buffer:
+      - output(): saídas publicadas (resultado, máscaras). Rodam por
+        `generations` conjuntos, para que um resultado já entregue à UI não
+        seja reescrito enquanto ainda pode ser mostrado;
+      - scratch(): intermédios que não saem do frame (HSV, cinza, erosão),
+        com um único buffer.
+    Com generations=0 só os intermédios são reutilizados: output() retorna
+    None e o OpenCV aloca cada saída, que nunca é reescrita depois de publicada.
+    Chame next_generation() no início de cada frame.
+    """
+    def __init__(self, generations=2, max_entries=64):
+        self.generations = max(0, generations)
+        self.max_entries = max_entries
+        self._generation = 0
+        self._buffers = {}
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def next_generation(self):
+        if self.generations:
+            self._generation = (self._generation + 1) % self.generations
+
+    def output(self, name, shape, dtype=np.uint8):
+        if not self.generations:
+            return None
+        return self._get(name, self._generation, shape, dtype)
+
+    def scratch(self, name, shape, dtype=np.uint8):
+        return self._get(name, -1, shape, dtype)
+
+    def _get(self, name, generation, shape, dtype):
+        key = (name, generation, tuple(shape), np.dtype(dtype).str)
+        buf = self._buffers.get(key)
+        if buf is not None:
+            self.stats['hits'] += 1
+            return buf
+        self.stats['misses'] += 1
+        if len(self._buffers) >= self.max_entries:
+            # Mudança de resolução/ROI: descarta o buffer mais antigo
+            self._buffers.pop(next(iter(self._buffers)))
+        buf = np.empty(shape, dtype=dtype)
+        self._buffers[key] = buf
+        return buf
+
+    def nbytes(self):
+        """Memória total retida pelo pool."""
+        return sum(b.nbytes for b in self._buffers.values())
@@ -0,0 +1,141 @@
+import cv2 as cv
+import numpy as np
+
+
+# Nomes das classes de cor; o índice é o id da classe
+COLOR_NAMES = ("undefined", "red", "blue", "white")
+
+# Limiares BGR empíricos (os mesmos usados historicamente em get_color_of_point).
+# Podem ser sobrescritos por perfil com a chave "color_thresholds" no plc_config.json.
+DEFAULT_COLOR_THRESHOLDS = {
+    "dark_max": 30,      # max(b, g, r) abaixo disto -> cor muito escura (undefined)
+    "red_min": 120,      # r mínimo para vermelho
+    "red_margin": 80,    # r - b mínimo para vermelho
+    "blue_min": 150,     # b mínimo para azul
+    "blue_margin": 50,   # b - r mínimo para azul
+    "white_min": 120,    # max(b, g, r) mínimo para branco
+}
+
+# Tabelas BGR -> classe já construídas, partilhadas entre frames e instâncias com os mesmos limiares
+_LUT_CACHE = {}
+
+
+class ColorClassifier:
+    """
+    Classifica cores BGR em red, blue, white ou undefined.
+
+    Trabalha sobre arrays (N, 3) de uma só vez e calcula a cor de cada objeto
+    agregando todos os pixels da sua região num mapa de rótulos (np.bincount),
+    em vez de olhar apenas para o pixel do centroide.
+    """
+    def __init__(self, thresholds=None):
+        self.thresholds = dict(DEFAULT_COLOR_THRESHOLDS)
+        if thresholds:
+            self.thresholds.update(thresholds)
+
+    def classify(self, bgr):
+        """Retorna o id da classe (índice em COLOR_NAMES) para cada cor BGR de um array (N, 3)."""
+        t = self.thresholds
+        bgr = np.asarray(bgr, dtype=np.float64).reshape(-1, 3)
+        b, g, r = bgr[:, 0], bgr[:, 1], bgr[:, 2]
+        max_bgr = bgr.max(axis=1)
+
+        # A ordem das condições é a mesma da lógica original (a primeira que casa vence)
+        conditions = [
+            max_bgr < t["dark_max"],
+            (r > t["red_min"]) & ((r - b) > t["red_margin"]),
+            (b > t["blue_min"]) & ((b - r) > t["blue_margin"]),
+            max_bgr > t["white_min"],
+        ]
+        return np.select(conditions, [0, 1, 2, 3], default=0).astype(np.uint8)
+
+    def classify_names(self, bgr):
+        return [COLOR_NAMES[i] for i in self.classify(bgr)]
+
+    @staticmethod
+    def region_colors(image, labels, n_objects, stat="mean"):
+        """
+        Cor BGR representativa de cada região de um mapa de rótulos.
+
+        labels: mapa int32 com 0 para fundo e 1..n_objects para os objetos.
+        stat: "mean" (média via np.bincount) ou "median" (mediana por canal).
+        Retorna um array (n_objects, 3) em float64.
+        """
+        inside = labels > 0
+        lab = labels[inside]
+        pixels = image[inside].astype(np.float64)
+        colors = np.zeros((n_objects, 3))
+        if lab.size == 0:
+            return colors
+
+        if stat == "median":
+            counts = np.bincount(lab, minlength=n_objects + 1)[1:]
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            middle = starts + counts // 2
+            present = counts > 0
+            for ch in range(3):
+                # Ordena por (rótulo, valor): a mediana de cada grupo fica no meio do seu bloco
+                order = np.lexsort((pixels[:, ch], lab))
+                colors[present, ch] = pixels[order, ch][middle[present]]
+            return colors
+
+        counts = np.bincount(lab, minlength=n_objects + 1)[1:]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for ch in range(3):
+                sums = np.bincount(lab, weights=pixels[:, ch], minlength=n_objects + 1)[1:]
+                colors[:, ch] = np.where(counts > 0, sums / counts, 0)
+        return colors
+
+    @staticmethod
+    def to_hsv(bgr):
+        """Converte um array (N, 3) de cores BGR para HSV (OpenCV, 8 bits)."""
+        bgr = np.clip(np.asarray(bgr), 0, 255).astype(np.uint8).reshape(-1, 1, 3)
+        if len(bgr) == 0:
+            return np.zeros((0, 3), np.uint8)  # cvtColor não aceita imagens vazias
+        return cv.cvtColor(bgr, cv.COLOR_BGR2HSV).reshape(-1, 3)
+
+    def build_lut(self, bits=5):
+        """
+        Tabela de consulta BGR quantizado -> id da classe.
+
+        Cada canal é reduzido a `bits` bits e a classe de cada célula é a do
+        centro da célula, pelo que a tabela tem 2**(3*bits) entradas.
+        """
+        levels = 1 << bits
+        step = 256 // levels
+        centers = np.arange(levels) * step + step // 2
+        b, g, r = np.meshgrid(centers, centers, centers, indexing="ij")
+        grid = np.stack([b.ravel(), g.ravel(), r.ravel()], axis=1)
+        return self.classify(grid)
+
+    def get_lut(self, bits=5):
+        """Tabela de build_lut calculada uma única vez por combinação de limiares."""
+        key = (tuple(sorted(self.thresholds.items())), bits)
+        lut = _LUT_CACHE.get(key)
+        if lut is None:
+            lut = self.build_lut(bits)
+            _LUT_CACHE[key] = lut
+        return lut
+
+    def classify_image(self, image, bits=5, out=None, work=None):
+        """
+        Converte uma imagem BGR num mapa de classes com uma única consulta à tabela.
+        out: buffer uint8 opcional (forma da imagem sem canais) para o mapa.
+        work: par opcional de buffers uint16 com essa forma, para o índice da tabela.
+        """
+        shift = 8 - bits
+        if work is None:
+            q = (image >> shift).astype(np.uint16)
+            index = (q[..., 0] << (2 * bits)) | (q[..., 1] << bits) | q[..., 2]
+        else:
+            # Mesmo índice, calculado sem temporários
+            index, tmp = work
+            np.right_shift(image[..., 0], shift, out=index)
+            np.left_shift(index, 2 * bits, out=index)
+            np.right_shift(image[..., 1], shift, out=tmp)
+            np.left_shift(tmp, bits, out=tmp)
+            np.bitwise_or(index, tmp, out=index)
+            np.right_shift(image[..., 2], shift, out=tmp)
+            np.bitwise_or(index, tmp, out=index)
+        # mode="clip": o índice está sempre dentro da tabela e assim o out não é bufferizado
+        return np.take(self.get_lut(bits), index, out=out, mode="clip")
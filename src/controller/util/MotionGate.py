@@ -0,0 +1,82 @@
+import cv2 as cv
+import numpy as np
+
+# Limiar por omissão (níveis de cinza) quando o perfil não define "motion_threshold"
+DEFAULT_MOTION_THRESHOLD = 12
+
+
+class MotionGate:
+    """
+    Detetor de mudança barato para saltar o processamento de cenas paradas.
+
+    Cada frame é reduzido a uma miniatura em cinza (INTER_AREA, `width` px de
+    largura) e comparado com a miniatura do último frame processado. O frame
+    só conta como "mudou" se pelo menos `min_pixels` pixels da miniatura
+    diferirem mais do que `threshold` níveis de cinza (uma peça pequena a
+    entrar chega, o ruído do sensor é absorvido pela redução). A referência
+    só avança nos frames processados, por isso um deslizamento lento acaba
+    por passar o limiar; a cada `max_skip` frames saltados processa-se um.
+    threshold <= 0 desliga o filtro (todos os frames são processados).
+    """
+    def __init__(self, threshold=DEFAULT_MOTION_THRESHOLD, width=160, min_pixels=4, max_skip=30):
+        self.threshold = threshold
+        self.width = width
+        self.min_pixels = min_pixels
+        self.max_skip = max_skip
+        self.stats = {'processed': 0, 'skipped': 0}
+        self.reset()
+
+    def reset(self):
+        """Esquece a referência: o próximo frame é sempre processado."""
+        self._reference = None
+        self._skipped_run = 0
+        self._thumb = None
+        self._gray = None
+        self._diff = None
+
+    def _thumbnail(self, image):
+        h, w = image.shape[:2]
+        size = (self.width, max(1, round(h * self.width / w)))
+        if self._thumb is None or self._thumb.shape[1::-1] != size:
+            # Miniaturas e diferença reutilizadas entre frames (tamanho fixo)
+            self._thumb = np.empty((size[1], size[0]) + image.shape[2:], np.uint8)
+            self._gray = np.empty((size[1], size[0]), np.uint8)
+            self._diff = np.empty((size[1], size[0]), np.uint8)
+            self._reference = None
+        cv.resize(image, size, dst=self._thumb, interpolation=cv.INTER_AREA)
+        if self._thumb.ndim == 3:
+            cv.cvtColor(self._thumb, cv.COLOR_BGR2GRAY, dst=self._gray)
+        else:
+            np.copyto(self._gray, self._thumb)
+        return self._gray
+
+    def should_process(self, image, force=False):
+        """
+        True se o frame deve passar pela cadeia completa (e passa a ser a
+        referência); False se a cena não mudou e o último resultado serve.
+        force: processa sempre (ex.: os parâmetros mudaram).
+        """
+        if self.threshold <= 0:
+            self.stats['processed'] += 1
+            return True
+        gray = self._thumbnail(image)
+        process = force or self._reference is None or self._skipped_run >= self.max_skip
+        if not process:
+            cv.absdiff(gray, self._reference, dst=self._diff)
+            process = cv.countNonZero(cv.threshold(self._diff, self.threshold, 255, cv.THRESH_BINARY,
+                                                   dst=self._diff)[1]) >= self.min_pixels
+        if process:
+            if self._reference is None:
+                self._reference = gray.copy()
+            else:
+                np.copyto(self._reference, gray)
+            self._skipped_run = 0
+            self.stats['processed'] += 1
+        else:
+            self._skipped_run += 1
+            self.stats['skipped'] += 1
+        return process
+
+    def skipped_ratio(self):
+        total = self.stats['processed'] + self.stats['skipped']
+        return self.stats['skipped'] / total if total else 0.0
@@ -0,0 +1,137 @@
+import numpy as np
+
+
+def detections_from_circles(circles):
+    """Deteções do ObjectTracker a partir de círculos (x, y, r)."""
+    return [{"center": (x, y), "bbox": (x - r, y - r, 2 * r, 2 * r)} for x, y, r in circles]
+
+
+def _iou(boxes_a, boxes_b):
+    """Matriz (len(a), len(b)) de IoU entre caixas (x, y, w, h)."""
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    x0 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y0 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x1 = np.minimum(a[:, None, 0] + a[:, None, 2], b[None, :, 0] + b[None, :, 2])
+    y1 = np.minimum(a[:, None, 1] + a[:, None, 3], b[None, :, 1] + b[None, :, 3])
+    inter = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    union = (a[:, None, 2] * a[:, None, 3]) + (b[None, :, 2] * b[None, :, 3]) - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class ObjectTracker:
+    """
+    Associa as deteções de frames consecutivos e dá a cada peça um ID estável.
+
+    Cada trilha tem centro, caixa e velocidade (px/frame, modelo de velocidade
+    constante). Em cada update a posição das trilhas é prevista para o frame
+    atual e as deteções são associadas por ordem de custo (distância ao centro
+    previsto e IoU com a caixa prevista), desde que o centro esteja a menos de
+    max_distance ou a IoU seja pelo menos min_iou.
+
+    Eventos devolvidos por update:
+        ("new", id)   -> a trilha chegou a min_hits deteções (peça nova, conta uma vez)
+        ("left", id)  -> a trilha confirmada ficou max_missed frames sem deteção
+    A chave "info" de cada trilha (None ao nascer) guarda dados caros que só
+    precisam de ser calculados uma vez por peça (ex.: classificação de cor).
+    """
+    def __init__(self, max_distance=60, min_iou=0.1, max_missed=5, min_hits=1, smoothing=0.5):
+        self.max_distance = max_distance
+        self.min_iou = min_iou
+        self.max_missed = max_missed
+        self.min_hits = min_hits
+        self.smoothing = smoothing
+        self.reset()
+
+    def reset(self):
+        self.tracks = {}       # id -> trilha
+        self.next_id = 1
+        self.total = 0         # Peças confirmadas desde o último reset
+        self._frame = -1
+
+    def update(self, detections, frame_id=None):
+        """
+        detections: lista de dicts com "center" (x, y) e "bbox" (x, y, w, h).
+        frame_id: número do frame (define o intervalo usado na previsão);
+        por omissão, cada chamada avança um frame.
+        Retorna (ids, events): ids[i] é o ID da trilha da deteção i.
+        """
+        frame = self._frame + 1 if frame_id is None else frame_id
+        self._frame = frame
+        events = []
+
+        track_ids = list(self.tracks.keys())
+        predicted_centers, predicted_boxes = [], []
+        for tid in track_ids:
+            track = self.tracks[tid]
+            dt = frame - track["last_frame"]
+            dx, dy = track["velocity"][0] * dt, track["velocity"][1] * dt
+            x, y, w, h = track["bbox"]
+            predicted_centers.append((track["center"][0] + dx, track["center"][1] + dy))
+            predicted_boxes.append((x + dx, y + dy, w, h))
+
+        ids = [None] * len(detections)
+        if track_ids and detections:
+            centers = np.array([d["center"] for d in detections], dtype=np.float64)
+            dist = np.linalg.norm(np.array(predicted_centers)[:, None, :] - centers[None, :, :], axis=2)
+            iou = _iou(predicted_boxes, [d["bbox"] for d in detections])
+            valid = (dist <= self.max_distance) | (iou >= self.min_iou)
+            cost = np.where(valid, dist / self.max_distance + (1 - iou), np.inf)
+
+            # Associação gulosa por custo crescente (poucas peças por frame)
+            used_tracks = set()
+            for flat in np.argsort(cost, axis=None):
+                t, d = np.unravel_index(flat, cost.shape)
+                if not np.isfinite(cost[t, d]):
+                    break
+                if t in used_tracks or ids[d] is not None:
+                    continue
+                used_tracks.add(t)
+                ids[d] = track_ids[t]
+                self._correct(self.tracks[track_ids[t]], detections[d], frame, events)
+
+        for i, det in enumerate(detections):
+            if ids[i] is None:
+                ids[i] = self._create(det, frame, events)
+
+        for tid in track_ids:
+            track = self.tracks[tid]
+            if track["last_frame"] != frame and frame - track["last_frame"] > self.max_missed:
+                del self.tracks[tid]
+                if track["hits"] >= self.min_hits:
+                    events.append(("left", tid))
+        return ids, events
+
+    def _create(self, det, frame, events):
+        tid = self.next_id
+        self.next_id += 1
+        self.tracks[tid] = {
+            "id": tid,
+            "center": tuple(float(v) for v in det["center"]),
+            "bbox": tuple(float(v) for v in det["bbox"]),
+            "velocity": (0.0, 0.0),
+            "hits": 1,
+            "first_frame": frame,
+            "last_frame": frame,
+            "info": None,
+        }
+        self._confirm(self.tracks[tid], events)
+        return tid
+
+    def _correct(self, track, det, frame, events):
+        dt = max(1, frame - track["last_frame"])
+        cx, cy = (float(v) for v in det["center"])
+        vx = (cx - track["center"][0]) / dt
+        vy = (cy - track["center"][1]) / dt
+        a = self.smoothing
+        track["velocity"] = (a * vx + (1 - a) * track["velocity"][0], a * vy + (1 - a) * track["velocity"][1])
+        track["center"] = (cx, cy)
+        track["bbox"] = tuple(float(v) for v in det["bbox"])
+        track["last_frame"] = frame
+        track["hits"] += 1
+        self._confirm(track, events)
+
+    def _confirm(self, track, events):
+        if track["hits"] == self.min_hits:
+            self.total += 1
+            events.append(("new", track["id"]))
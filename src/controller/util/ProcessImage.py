@@ -3,15 +3,89 @@ import cv2 as cv
 import numpy as np
 import os
 
+from src.model.LatencyMonitor import LatencyMonitor
+from .ColorClassifier import COLOR_NAMES, ColorClassifier
+
+# Kernels morfológicos partilhados, por tamanho (só são lidos pelo OpenCV)
+_KERNELS = {}
+
+
+def get_kernel(size):
+    kernel = _KERNELS.get(size)
+    if kernel is None:
+        kernel = _KERNELS[size] = np.ones(size, np.uint8)
+    return kernel
+
+
+class FrameContext:
+    """
+    Planos derivados de um frame (desfocado, HSV, cinza), calculados sob demanda
+    uma única vez e partilhados por todas as máscaras e deteções desse frame.
+    Os planos HSV e cinza derivam do plano desfocado.
+    Com um BufferPool, os planos são escritos em buffers reutilizados.
+    """
+    def __init__(self, image, blur_ksize=1, pool=None):
+        self.image = image
+        blur_ksize = int(blur_ksize)
+        if blur_ksize % 2 == 0: blur_ksize += 1
+        self.blur_ksize = blur_ksize
+        self.pool = pool
+        self._planes = {}
+
+    def _plane(self, name, factory):
+        plane = self._planes.get(name)
+        if plane is None:
+            plane = factory()
+            self._planes[name] = plane
+        return plane
+
+    @property
+    def blurred(self):
+        if self.blur_ksize <= 1:
+            return self.image
+        # O plano desfocado é a base da imagem de resultado: é uma saída publicada
+        return self._plane("blurred", lambda: cv.GaussianBlur(self.image, (self.blur_ksize, self.blur_ksize), 0,
+                                                              dst=self._buffer("blurred", self.image.shape, True)))
+
+    @property
+    def hsv(self):
+        return self._plane("hsv", lambda: cv.cvtColor(self.blurred, cv.COLOR_BGR2HSV,
+                                                      dst=self._buffer("hsv", self.image.shape)))
+
+    @property
+    def gray(self):
+        return self._plane("gray", lambda: cv.cvtColor(self.blurred, cv.COLOR_BGR2GRAY,
+                                                       dst=self._buffer("gray", self.image.shape[:2])))
+
+    def _buffer(self, name, shape, published=False, dtype=np.uint8):
+        """Buffer do pool (None sem pool: o OpenCV aloca a saída)."""
+        if self.pool is None:
+            return None
+        if published:
+            return self.pool.output(name, shape, dtype)
+        return self.pool.scratch(name, shape, dtype)
+
+    def materialized(self):
+        """Lista dos planos efetivamente calculados neste frame."""
+        return list(self._planes.keys())
+
 
 class ProcessImage:
 
-    def __init__(self, image=None, file_name=None):
+    def __init__(self, image=None, file_name=None, blur=1, color_thresholds=None, pool=None):
         self.file_name = file_name
         self.img_original = image if image is not None else self.get_image(file_name)
+        # Cache dos planos derivados (HSV, cinza, desfocado) deste frame;
+        # com um BufferPool, as máscaras e planos reutilizam buffers entre frames
+        self.context = FrameContext(self.img_original, blur, pool)
+        self._buffer = self.context._buffer
+        # Limiares de cor configuráveis por perfil ("color_thresholds")
+        self.color_classifier = ColorClassifier(color_thresholds)
+        self._class_map = None
         self.count_objects = 0
         self.count_circles = 0
         self.objects = {}
+        self.track_events = []
         
         # Inicializa o dicionário de estatísticas zerado
         self.stats = {
@@ -76,8 +150,8 @@ class ProcessImage:
             print(f"\n{'='*70}\n")
     
     def convert_to_hsv(self):
-        # Converte a imagem original (BGR) para o espaço de cor HSV
-        return cv.cvtColor(self.img_original, cv.COLOR_BGR2HSV)
+        # Imagem (BGR) no espaço de cor HSV, calculada uma única vez por frame
+        return self.context.hsv
 
     @staticmethod
     def get_central_point(objecto):
@@ -92,34 +166,56 @@ class ProcessImage:
     def create_mask_by_HSV(self, lower_bound, upper_bound, isInverted=False):
         # Cria uma máscara binária filtrando pelos intervalos de cor HSV
         img_hsv = self.convert_to_hsv()
-        mask = cv.inRange(img_hsv, lower_bound, upper_bound)
+        mask = cv.inRange(img_hsv, lower_bound, upper_bound, dst=self._buffer("mask", img_hsv.shape[:2], True))
         if isInverted:
-            mask = cv.bitwise_not(mask)
+            mask = cv.bitwise_not(mask, dst=mask)
         return mask
 
     def create_mask_by_threshold(self, th_min, th_max, inverted=False):
         type_of_mask = cv.THRESH_BINARY_INV if inverted else cv.THRESH_BINARY
-        # Converte a imagem para escala de cinza
-        gray = cv.cvtColor(self.img_original, cv.COLOR_BGR2GRAY)
+        # Escala de cinza partilhada pelo contexto do frame
+        gray = self.context.gray
         # Aplica limiarização para criar uma máscara binária
-        _, mask = cv.threshold(gray, th_min, th_max, type_of_mask)
+        _, mask = cv.threshold(gray, th_min, th_max, type_of_mask, dst=self._buffer("mask", gray.shape, True))
         
         return mask
+
+    def get_class_map(self, bits=5):
+        """Mapa de classes de cor (ids de COLOR_NAMES) do frame, via tabela de consulta quantizada."""
+        if self._class_map is None:
+            blurred = self.context.blurred
+            shape = blurred.shape[:2]
+            work = None
+            if self.context.pool is not None:
+                work = (self._buffer("class_index", shape, dtype=np.uint16), self._buffer("class_tmp", shape, dtype=np.uint16))
+            self._class_map = self.color_classifier.classify_image(blurred, bits, out=self._buffer("class_map", shape),
+                                                                   work=work)
+        return self._class_map
+
+    def create_mask_by_class(self, targets=("red", "blue", "white"), inverted=False):
+        # Uma única consulta à tabela separa todas as classes; a máscara junta as classes alvo
+        selected = np.zeros(256, dtype=np.uint8)  # Tabela de 256 entradas para o cv.LUT
+        for name in targets:
+            selected[COLOR_NAMES.index(name)] = 255
+        if inverted:
+            selected[:len(COLOR_NAMES)] = 255 - selected[:len(COLOR_NAMES)]
+        class_map = self.get_class_map()
+        return cv.LUT(class_map, selected, dst=self._buffer("mask", class_map.shape, True))
     
     def remove_noise(self, mask, erode_kernel_size=(6,6), dilate_kernel_size=(3,3)):
-        # Cria kernels para as operações morfológicas
-        kernel_dilate = np.ones(dilate_kernel_size, np.uint8)
-        kernel_erode = np.ones(erode_kernel_size, np.uint8)
+        # Kernels das operações morfológicas (criados uma vez por tamanho)
+        kernel_dilate = get_kernel(tuple(dilate_kernel_size))
+        kernel_erode = get_kernel(tuple(erode_kernel_size))
         
         # Aplica erosão para remover pequenos ruídos brancos
-        mask = cv.erode(mask, kernel_erode)
+        eroded = cv.erode(mask, kernel_erode, dst=self._buffer("eroded", mask.shape))
         # Aplica dilatação para restaurar o tamanho dos objetos restantes
-        mask = cv.dilate(mask, kernel_dilate)
+        mask = cv.dilate(eroded, kernel_dilate, dst=self._buffer("mask_clean", mask.shape, True))
         return mask
 
     def get_contours(self, mask, th1=70, th2=150):
         # Detecta bordas com Canny e encontra contornos externos
-        edges = cv.Canny(mask, th1, th2)
+        edges = cv.Canny(mask, th1, th2, edges=self._buffer("edges", mask.shape))
         contours, hierarchy = cv.findContours(edges, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_SIMPLE)
         return contours, hierarchy
     
@@ -137,35 +233,40 @@ class ProcessImage:
         
         # Extrai componentes BGR
         b, g, r = int(pixel[0]), int(pixel[1]), int(pixel[2])
-        color_data = [(b, g, r)]
-        
-        max_rgb = max(b, g, r)
-        
-        # Lógica de classificação baseada em limiares RGB empíricos
-        if max_rgb < 30:
-            # Cor muito escura
-            color_data.append('undefined')
-        elif r > 120 and (r - b) > 80:
-            # Predominância clara de vermelho
-            color_data.append('red')
-        elif b > 150 and (b - r) > 50:
-            # Predominância clara de azul
-            color_data.append('blue')
-        elif max_rgb > 120:
-            # Claro o suficiente para ser branco (se não for nem vermelho nem azul)
-            color_data.append('white')
+        return [(b, g, r), self.color_classifier.classify_names([(b, g, r)])[0]]
+
+    def label_objects(self, mask, contours):
+        """
+        Mapa de rótulos (int32) com 1..N para a região de cada contorno.
+        Os furos e o fundo ficam com 0 (apenas pixels ativos da máscara).
+        """
+        labels = self._buffer("labels", mask.shape[:2], dtype=np.int32)
+        if labels is None:
+            labels = np.zeros(mask.shape[:2], dtype=np.int32)
         else:
-            color_data.append('undefined')
-            
-        return color_data
+            labels.fill(0)
+        for i in range(len(contours)):
+            cv.drawContours(labels, contours, i, i + 1, thickness=-1)
+        labels[mask == 0] = 0
+        return labels
+
+    def get_region_colors(self, mask, contours, stat="mean"):
+        """
+        Classifica a cor de cada objeto a partir de todos os pixels da sua região.
+        Retorna (ids de classe, cores BGR agregadas (N, 3), cores HSV (N, 3)).
+        """
+        labels = self.label_objects(mask, contours)
+        bgr = self.color_classifier.region_colors(self.img_original, labels, len(contours), stat)
+        return self.color_classifier.classify(bgr), bgr, self.color_classifier.to_hsv(bgr)
     
-    def draw_bounding_rect(self, img, contour):
-        x, y, w, h = cv.boundingRect(contour)
+    def draw_bounding_rect(self, img, rect):
+        x, y, w, h = rect
         cv.rectangle(img, (x, y), (x + w, y + h), (0, 255, 0), 2)
 
-    def get_circles(self, mask, dp=1, min_dist=40, param1=50, param2=25, min_radius=10, max_radius=100):
+    def get_circles(self, mask, dp=1, min_dist=40, param1=50, param2=25, min_radius=10, max_radius=100, blur_ksize=9, blur_sigma=2,
+                    dst=None):
         # Aplica desfoque para reduzir ruído antes da Transformada de Hough
-        blurred = cv.GaussianBlur(mask, (9, 9), 2)
+        blurred = cv.GaussianBlur(mask, (blur_ksize, blur_ksize), blur_sigma, dst=dst)
         
         circles = cv.HoughCircles(
             blurred, 
@@ -181,6 +282,111 @@ class ProcessImage:
             return np.uint16(np.around(circles))[0]
         return []
 
+    def get_circles_pyramid(self, mask, levels=1, dp=1, min_dist=40, param1=50, param2=25, min_radius=10, max_radius=100):
+        """
+        Deteção de círculos em pirâmide (grosso -> fino).
+
+        Procura candidatos na máscara reduzida 2**levels vezes, com min_dist,
+        raios e param2 escalados, e refina cada candidato com HoughCircles só
+        numa pequena janela da máscara em resolução completa. Candidatos que o
+        refinamento não confirma são descartados (falsos positivos da escala reduzida).
+        """
+        if levels <= 0:
+            return self.get_circles(mask, dp, min_dist, param1, param2, min_radius, max_radius,
+                                    dst=self._buffer("hough_blur", mask.shape))
+
+        scale = 2 ** levels
+        h, w = mask.shape[:2]
+        if w // scale < 8 or h // scale < 8:
+            return self.get_circles(mask, dp, min_dist, param1, param2, min_radius, max_radius,
+                                    dst=self._buffer("hough_blur", mask.shape))
+
+        small = cv.resize(mask, (w // scale, h // scale), interpolation=cv.INTER_AREA,
+                          dst=self._buffer("pyramid", (h // scale, w // scale)))
+        # O desfoque 9x9 da resolução completa equivale a um núcleo menor na escala reduzida
+        small_ksize = max(3, (9 // scale) | 1)
+        candidates = self.get_circles(small, dp,
+                                      max(1, min_dist / scale),
+                                      param1,
+                                      max(1, param2 / scale),
+                                      max(1, int(min_radius // scale)),
+                                      max(2, int(math.ceil(max_radius / scale)) + 1),
+                                      blur_ksize=small_ksize, blur_sigma=max(0.5, 2 / scale),
+                                      dst=self._buffer("pyramid_blur", small.shape))
+
+        circles = []
+        for cand in candidates:
+            cx, cy, r = int(cand[0]) * scale, int(cand[1]) * scale, int(cand[2]) * scale
+            refined = self._refine_circle(mask, cx, cy, r, scale, dp, param1, param2, min_radius, max_radius)
+            if refined is not None:
+                circles.append(refined)
+        if not circles:
+            return []
+        return np.array(circles, dtype=np.uint16)
+
+    def _refine_circle(self, mask, cx, cy, r, tolerance, dp, param1, param2, min_radius, max_radius):
+        """Procura um círculo de raio r ± tolerance numa janela de resolução completa centrada em (cx, cy)."""
+        h, w = mask.shape[:2]
+        margin = r + 2 * tolerance + 4
+        x0, y0 = max(0, cx - margin), max(0, cy - margin)
+        x1, y1 = min(w, cx + margin + 1), min(h, cy + margin + 1)
+        window = mask[y0:y1, x0:x1]
+        if window.size == 0:
+            return None
+        r_min = max(int(min_radius), r - tolerance, 1)
+        r_max = min(int(max_radius), r + tolerance) if max_radius > 0 else r + tolerance
+        if r_max < r_min:
+            r_max = r_min
+        found = self.get_circles(window, dp, max(window.shape), param1, param2, r_min, r_max)
+        if len(found) == 0:
+            return None
+        x, y, rr = (int(v) for v in found[0])
+        return (x + x0, y + y0, rr)
+
+    def get_circles_by_contour(self, mask, min_radius=10, max_radius=100, min_circularity=0.83):
+        """
+        Detetor rápido de círculos por contornos (alternativa ao HoughCircles).
+
+        Usa as características vetorizadas de extract_object_features: cada
+        objeto com circularidade >= min_circularity vira um círculo centrado no
+        centroide, com o raio equivalente à sua área (sqrt(área / π)).
+        """
+        features = self.extract_object_features(mask, min_area=math.pi * max(min_radius, 1) ** 2 * 0.5,
+                                                circularity_threshold=min_circularity)
+        radius = np.sqrt(features["area"] / math.pi)
+        keep = features["is_circular"] & (radius >= min_radius)
+        if max_radius > 0:
+            keep &= radius <= max_radius
+        if not np.any(keep):
+            return []
+        circles = np.column_stack([features["centroid"][keep], radius[keep]])
+        return np.uint16(np.around(circles))
+
+    def find_circles(self, mask, engine="hough", pyramid_levels=0, dp=1, min_dist=40, param1=50, param2=25,
+                     min_radius=10, max_radius=100, min_circularity=0.83):
+        """
+        Deteção de círculos com o motor escolhido no perfil ("circle_engine"):
+            hough   -> HoughCircles (em pirâmide se pyramid_levels > 0)
+            contour -> contornos + circularidade (get_circles_by_contour)
+            hybrid  -> candidatos por contornos, confirmados por HoughCircles
+                       numa janela local em resolução completa
+        Retorna um array (N, 3) de (x, y, r), como get_circles.
+        """
+        if engine == "contour":
+            return self.get_circles_by_contour(mask, min_radius, max_radius, min_circularity)
+        if engine == "hybrid":
+            # Candidatos permissivos: o HoughCircles local decide se é um círculo
+            candidates = self.get_circles_by_contour(mask, min_radius, max_radius, min_circularity * 0.8)
+            circles = []
+            for cx, cy, r in candidates:
+                tolerance = max(2, int(r) // 5)
+                refined = self._refine_circle(mask, int(cx), int(cy), int(r), tolerance,
+                                              dp, param1, param2, min_radius, max_radius)
+                if refined is not None:
+                    circles.append(refined)
+            return np.array(circles, dtype=np.uint16) if circles else []
+        return self.get_circles_pyramid(mask, pyramid_levels, dp, min_dist, param1, param2, min_radius, max_radius)
+
     def detect_circles(self, mask, image_overlay, draw=False, **kwargs):
         # Detecta círculos e desenha na imagem de sobreposição
         circles = self.get_circles(mask, **kwargs)
@@ -198,8 +404,8 @@ class ProcessImage:
     def draw_central_point(self, img, point):
         cv.circle(img, point, 5, (0, 0, 255), -1)
 
-    def draw_color_text(self, img, text, contour, ajust=0):
-        x, y, w, h = cv.boundingRect(contour)
+    def draw_color_text(self, img, text, rect, ajust=0):
+        x, y, w, h = rect
         font = cv.FONT_HERSHEY_SIMPLEX
         scale = 0.6
         thickness = 2
@@ -226,122 +432,203 @@ class ProcessImage:
         circularity = 4 * math.pi * (area / (perimeter * perimeter))
         return circularity >= threshold
 
+    def extract_object_features(self, mask, min_area=0, circularity_threshold=0.75):
+        """
+        Extrai, numa única chamada vetorizada, as características de todos os
+        objetos (contornos externos) de uma máscara binária.
+
+        Os pontos de todos os contornos são concatenados num único array e as
+        somas por contorno são feitas com np.add.reduceat, o que reproduz
+        contourArea, arcLength, moments e boundingRect sem laço em Python.
+
+        Retorna um dicionário de arrays colunares, um elemento por objeto:
+            contours     -> lista com os contornos dos objetos (para desenho)
+            area         -> área delimitada pelo contorno externo
+            centroid     -> (N, 2) com (cx, cy)
+            bbox         -> (N, 4) com (x, y, w, h)
+            perimeter    -> perímetro do contorno fechado
+            circularity  -> 4π * área / perímetro²
+            is_circular  -> circularity >= circularity_threshold
+            hole_count   -> número de furos (contornos filhos na hierarquia)
+        Objetos com área < min_area são ignorados (ruído).
+        """
+        monitor = LatencyMonitor()
+        t0 = monitor.start()
+        contours, hierarchy = cv.findContours(mask, cv.RETR_CCOMP, cv.CHAIN_APPROX_SIMPLE)
+        features = {
+            "contours": [],
+            "area": np.zeros(0),
+            "centroid": np.zeros((0, 2)),
+            "bbox": np.zeros((0, 4), dtype=np.int64),
+            "perimeter": np.zeros(0),
+            "circularity": np.zeros(0),
+            "is_circular": np.zeros(0, dtype=bool),
+            "hole_count": np.zeros(0, dtype=np.int64),
+        }
+        if not contours:
+            monitor.stop("contours", t0)
+            return features
+
+        n = len(contours)
+        lengths = np.fromiter((len(c) for c in contours), dtype=np.int64, count=n)
+        starts = np.zeros(n, dtype=np.int64)
+        np.cumsum(lengths[:-1], out=starts[1:])
+
+        pts = np.concatenate(contours).reshape(-1, 2)
+        x = pts[:, 0].astype(np.float64)
+        y = pts[:, 1].astype(np.float64)
+
+        # Índice do ponto seguinte em cada contorno (fechado: o último liga ao primeiro)
+        nxt = np.arange(1, len(pts) + 1)
+        nxt[starts + lengths - 1] = starts
+        x_next, y_next = x[nxt], y[nxt]
+
+        # Fórmula do laço (shoelace) para área e momentos de primeira ordem
+        cross = x * y_next - x_next * y
+        signed_area = np.add.reduceat(cross, starts) / 2
+        area = np.abs(signed_area)
+        perimeter = np.add.reduceat(np.hypot(x_next - x, y_next - y), starts)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cx = np.add.reduceat((x + x_next) * cross, starts) / (6 * signed_area)
+            cy = np.add.reduceat((y + y_next) * cross, starts) / (6 * signed_area)
+            circularity = np.where(perimeter > 0, 4 * math.pi * area / (perimeter * perimeter), 0.0)
+
+        top_left = np.minimum.reduceat(pts, starts)
+        bottom_right = np.maximum.reduceat(pts, starts)
+        bbox = np.hstack([top_left, bottom_right - top_left + 1])
+
+        # Hierarquia RETR_CCOMP: contornos com pai são furos do objeto pai
+        parent = hierarchy[0][:, 3]
+        hole_count = np.bincount(parent[parent != -1], minlength=n)
+
+        keep = np.nonzero((parent == -1) & (area >= min_area) & (area > 0))[0]
+
+        features["contours"] = [contours[i] for i in keep]
+        features["area"] = area[keep]
+        features["centroid"] = np.stack([cx[keep], cy[keep]], axis=1)
+        features["bbox"] = bbox[keep]
+        features["perimeter"] = perimeter[keep]
+        features["circularity"] = circularity[keep]
+        features["is_circular"] = circularity[keep] >= circularity_threshold
+        features["hole_count"] = hole_count[keep]
+        monitor.stop("contours", t0)
+        return features
+
     def objects_detection(self, 
-                          objetos, 
+                          mask, 
                           tolerance=170, 
                           show_contours=False, 
                           central_point=False, 
                           show_color=False, 
                           show_id=False, 
-                          hierarchy=None, 
-                          show_holes=False):
+                          show_holes=False,
+                          color_stat="mean",
+                          tracker=None,
+                          frame_id=None):
         """
-        Detecta objetos na imagem e coleta todas as informações solicitadas.
+        Detecta objetos na máscara e coleta todas as informações solicitadas.
+        As estatísticas e os desenhos são construídos a partir dos arrays de
+        extract_object_features (sem laço de contornos em Python).
+        A cor de cada objeto é a média (ou mediana, color_stat="median") de
+        toda a sua região, não apenas do pixel central.
+        Com um ObjectTracker (vídeo), os IDs são os das trilhas, estáveis entre
+        frames, a cor é calculada só no frame em que a trilha nasce e os
+        eventos "new"/"left" ficam em self.track_events.
         """
         # Cria uma cópia da imagem para desenhar os resultados sem alterar a original
-        image_overlay = self.img_original.copy()
+        image_overlay = self._buffer("overlay", self.img_original.shape, True)
+        if image_overlay is None:
+            image_overlay = self.img_original.copy()
+        else:
+            np.copyto(image_overlay, self.img_original)
+        
+        features = self.extract_object_features(mask, min_area=tolerance)
+        total = len(features["contours"])
+        circular = features["is_circular"]
+        hole_count = features["hole_count"]
+        centers = features["centroid"].astype(np.int32)
+        if tracker is None:
+            color_ids, region_bgr, region_hsv = self.get_region_colors(mask, features["contours"], color_stat)
+            ids = list(range(self.count_objects + 1, self.count_objects + total + 1))
+            self.count_objects += total
+        else:
+            ids, color_ids, region_bgr, region_hsv = self._track_objects(mask, features, tracker, frame_id, color_stat)
+        color_counts = np.bincount(color_ids, minlength=len(COLOR_NAMES))
         
         # Reseta as estatísticas para esta nova detecção
         self.stats = {
-            'total_objects': 0,
-            'circular_objects': 0,
-            'non_circular_objects': 0,
-            'objects_with_holes': 0,
-            'red_objects': 0,
-            'blue_objects': 0,
-            'white_objects': 0,
-            'undefined_objects': 0
+            'total_objects': total,
+            'circular_objects': int(np.count_nonzero(circular)),
+            'non_circular_objects': int(total - np.count_nonzero(circular)),
+            'objects_with_holes': int(np.count_nonzero(hole_count)),
+            'red_objects': int(color_counts[COLOR_NAMES.index('red')]),
+            'blue_objects': int(color_counts[COLOR_NAMES.index('blue')]),
+            'white_objects': int(color_counts[COLOR_NAMES.index('white')]),
+            'undefined_objects': int(color_counts[COLOR_NAMES.index('undefined')])
         }
-        
-        # Obtém a hierarquia (se disponível) para verificar pais/filhos
-        hier = hierarchy[0] if hierarchy is not None else None
-
-        for i, objeto in enumerate(objetos):
-            # Se houver hierarquia, verifica se o contorno é um "filho" (furo)
-            # hier[i][3] é o índice do pai. Se != -1, significa que está dentro de outro contorno.
-            if hier is not None:
-                parent_idx = hier[i][3]
-                if parent_idx != -1:
-                    continue # Ignora contornos internos na contagem principal
-
-            # Filtra objetos muito pequenos (ruído)
-            object_area = cv.contourArea(objeto)
-            if object_area >= tolerance:
-                self.count_objects += 1
-                self.stats['total_objects'] += 1
-                
-                # Calcula o centroide
-                cx, cy = self.get_central_point(objeto)
-                
-                perimeter = cv.arcLength(objeto, True)
-                
-                # Verifica circularidade
-                is_circular = self.is_circular(objeto)
-                if is_circular:
-                    self.stats['circular_objects'] += 1
-                else:
-                    self.stats['non_circular_objects'] += 1
-                
-                # Identifica a cor no ponto central
-                color = self.get_color_of_point(image_overlay, (cx, cy))
-                color_name = color[1]
-                
-                # Atualiza estatísticas de cor
-                if color_name == 'red':
-                    self.stats['red_objects'] += 1
-                elif color_name == 'blue':
-                    self.stats['blue_objects'] += 1
-                elif color_name == 'white':
-                    self.stats['white_objects'] += 1
-                else:
-                    self.stats['undefined_objects'] += 1
-                
-                # Desenha o retângulo delimitador
-                self.draw_bounding_rect(image_overlay, objeto)
-                
-                # Desenha informações adicionais conforme solicitado
-                if show_contours:
-                    cv.drawContours(image_overlay, [objeto], -1, (0, 255, 0), 2)
-                if central_point:
-                    self.draw_central_point(image_overlay, (cx, cy))
-                if show_color:
-                    self.draw_color_text(image_overlay, color_name, objeto)
-                if show_id:
-                    self.draw_color_text(image_overlay, str(self.count_objects), objeto, ajust=-15)
-
-                # Verificação de furos (filhos na hierarquia)
-                has_hole = False
-                hole_count = 0
-                if hier is not None:
-                    # hier[i][2] é o índice do primeiro filho
-                    child_idx = hier[i][2]
-                    while child_idx != -1:
-                        hole_count += 1
-                        has_hole = True
-                        child_idx = hier[child_idx][0] # Próximo irmão do filho
-
-                    # Atualiza estatísticas de furos
-                    if has_hole:
-                        self.stats['objects_with_holes'] += 1
-                        if show_holes:
-                            hole_text = f"Furos: {hole_count}"
-                            cv.putText(image_overlay, hole_text, (cx - 30, cy + 20), 
-                                     cv.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
-
-                # Armazena os dados do objeto detectado
-                self.objects[self.count_objects] = {
-                    "area": object_area,
-                    "perimeter": perimeter,
-                    "center": (cx, cy),
-                    "color": color_name,
-                    "central_color": color[0],
-                    "is_circular": is_circular,
-                    "has_hole": has_hole,
-                    "hole_count": hole_count
-                }
+
+        if show_contours and total:
+            cv.drawContours(image_overlay, features["contours"], -1, (0, 255, 0), 2)
+
+        for i in range(total):
+            cx, cy = int(centers[i, 0]), int(centers[i, 1])
+            rect = tuple(int(v) for v in features["bbox"][i])
+
+            color_name = COLOR_NAMES[color_ids[i]]
+            
+            # Desenha o retângulo delimitador
+            self.draw_bounding_rect(image_overlay, rect)
+            
+            # Desenha informações adicionais conforme solicitado
+            if central_point:
+                self.draw_central_point(image_overlay, (cx, cy))
+            if show_color:
+                self.draw_color_text(image_overlay, color_name, rect)
+            if show_id:
+                self.draw_color_text(image_overlay, str(ids[i]), rect, ajust=-15)
+
+            holes = int(hole_count[i])
+            if holes and show_holes:
+                hole_text = f"Furos: {holes}"
+                cv.putText(image_overlay, hole_text, (cx - 30, cy + 20), 
+                         cv.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 255), 2)
+
+            # Armazena os dados do objeto detectado
+            self.objects[ids[i]] = {
+                "area": float(features["area"][i]),
+                "perimeter": float(features["perimeter"][i]),
+                "center": (cx, cy),
+                "color": color_name,
+                "region_color": tuple(int(round(v)) for v in region_bgr[i]),
+                "region_hsv": tuple(int(v) for v in region_hsv[i]),
+                "is_circular": bool(circular[i]),
+                "has_hole": holes > 0,
+                "hole_count": holes
+            }
                 
         return image_overlay
 
+    def _track_objects(self, mask, features, tracker, frame_id, color_stat):
+        """
+        Associa os objetos às trilhas do tracker. Só as trilhas sem "info"
+        (novas) passam pela classificação de cor; as outras reutilizam-na.
+        Retorna (ids, ids de classe, cores BGR (N, 3), cores HSV (N, 3)).
+        """
+        detections = [{"center": tuple(c), "bbox": tuple(b)} for c, b in zip(features["centroid"], features["bbox"])]
+        ids, self.track_events = tracker.update(detections, frame_id)
+        fresh = [i for i, tid in enumerate(ids) if tracker.tracks[tid]["info"] is None]
+        if fresh:
+            contours = [features["contours"][i] for i in fresh]
+            class_ids, bgr, hsv = self.get_region_colors(mask, contours, color_stat)
+            for k, i in enumerate(fresh):
+                tracker.tracks[ids[i]]["info"] = (int(class_ids[k]), tuple(bgr[k]), tuple(hsv[k]))
+        infos = [tracker.tracks[tid]["info"] for tid in ids]
+        self.count_objects = tracker.total
+        return (ids,
+                np.array([info[0] for info in infos], dtype=np.int64),
+                np.array([info[1] for info in infos], dtype=np.float64).reshape(-1, 3),
+                np.array([info[2] for info in infos], dtype=np.float64).reshape(-1, 3))
+
     def get_statistics(self):
         """Retorna um dicionário com todas as estatísticas."""
         return self.stats.copy()
@@ -0,0 +1,91 @@
+import cv2 as cv
+import numpy as np
+
+
+class RegionOfInterest:
+    """
+    Região de interesse de um perfil: um ou mais retângulos e/ou polígonos.
+
+    Formato no plc_config.json (chave "roi" do perfil):
+        [[x, y, w, h], [[x1, y1], [x2, y2], [x3, y3], ...], ...]
+    Um item com 4 números é um retângulo; uma lista de pontos é um polígono.
+    O processamento corre só dentro do retângulo envolvente da união das
+    formas, e as coordenadas são devolvidas ao referencial do frame completo.
+    """
+    def __init__(self, shapes=None):
+        self.rects = []
+        self.polygons = []
+        for shape in shapes or []:
+            if len(shape) == 4 and not isinstance(shape[0], (list, tuple)):
+                x, y, w, h = (int(v) for v in shape)
+                if w > 0 and h > 0:
+                    self.rects.append((x, y, w, h))
+            elif len(shape) >= 3:
+                self.polygons.append(np.array(shape, dtype=np.int32).reshape(-1, 2))
+
+    def is_empty(self):
+        return not self.rects and not self.polygons
+
+    def to_list(self):
+        """Formato serializável para o plc_config.json."""
+        return [list(r) for r in self.rects] + [p.tolist() for p in self.polygons]
+
+    def to_text(self):
+        """Representação editável: formas separadas por ';' e números por ','."""
+        parts = [",".join(str(v) for v in r) for r in self.rects]
+        parts += [",".join(str(int(v)) for v in p.ravel()) for p in self.polygons]
+        return "; ".join(parts)
+
+    @classmethod
+    def from_text(cls, text):
+        """Lê o formato de to_text: 4 números = retângulo, 6 ou mais (pares) = polígono."""
+        shapes = []
+        for part in text.split(";"):
+            values = [int(float(v)) for v in part.replace(" ", "").split(",") if v]
+            if len(values) == 4:
+                shapes.append(values)
+            elif len(values) >= 6 and len(values) % 2 == 0:
+                shapes.append([values[i:i + 2] for i in range(0, len(values), 2)])
+        return cls(shapes)
+
+    def bounds(self, frame_shape):
+        """Retângulo envolvente (x0, y0, x1, y1) da união das formas, limitado ao frame."""
+        h, w = frame_shape[:2]
+        xs, ys = [], []
+        for x, y, rw, rh in self.rects:
+            xs += [x, x + rw]
+            ys += [y, y + rh]
+        for poly in self.polygons:
+            xs += [int(poly[:, 0].min()), int(poly[:, 0].max()) + 1]
+            ys += [int(poly[:, 1].min()), int(poly[:, 1].max()) + 1]
+        x0, y0 = max(0, min(xs)), max(0, min(ys))
+        x1, y1 = min(w, max(xs)), min(h, max(ys))
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return x0, y0, x1, y1
+
+    def needs_mask(self):
+        """Só é preciso mascarar quando a ROI não é exatamente o retângulo envolvente."""
+        return len(self.rects) + len(self.polygons) > 1 or bool(self.polygons)
+
+    def crop_mask(self, bounds, out=None):
+        """Máscara (255 dentro da ROI) no referencial do recorte `bounds` (em `out`, se dado)."""
+        x0, y0, x1, y1 = bounds
+        if out is None:
+            mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        else:
+            mask = out
+            mask.fill(0)
+        for x, y, rw, rh in self.rects:
+            cv.rectangle(mask, (x - x0, y - y0), (x - x0 + rw - 1, y - y0 + rh - 1), 255, thickness=-1)
+        if self.polygons:
+            cv.fillPoly(mask, [p - (x0, y0) for p in self.polygons], 255)
+        return mask
+
+    def draw(self, img, color=(0, 255, 255), thickness=1):
+        """Desenha o contorno da ROI no frame completo."""
+        for x, y, rw, rh in self.rects:
+            cv.rectangle(img, (x, y), (x + rw - 1, y + rh - 1), color, thickness)
+        if self.polygons:
+            cv.polylines(img, self.polygons, True, color, thickness)
+        return img
@@ -0,0 +1,89 @@
+import threading
+import time
+
+import numpy as np
+
+# Etapas medidas, na ordem em que um frame as percorre
+LATENCY_STAGES = ("capture", "blur", "mask", "morphology", "contours", "circles", "plc", "display", "frame_age",
+                  "end_to_end", "handshake")
+
+
+class LatencyMonitor:
+    """
+    Singleton com a latência de cada etapa do caminho quente (capture -> display).
+    "end_to_end" é o tempo da captura do frame até a escrita no PLC estar concluída;
+    "handshake" vai da borda do trigger até o PLC confirmar o sinal em True.
+
+    Cada etapa guarda as últimas `window` amostras num buffer circular; os
+    percentis (p50/p95/p99) são calculados só quando alguém os consulta
+    (painel da UI ou código). Desligado por omissão: nesse caso start()
+    devolve None e stop() retorna logo, por isso o custo é uma comparação.
+
+    Uso no código medido:
+        t0 = monitor.start()
+        ...
+        monitor.stop("mask", t0)
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(LatencyMonitor, cls).__new__(cls)
+            cls._instance.enabled = False
+            cls._instance.window = 1024
+            cls._instance._lock = threading.Lock()
+            cls._instance._samples = {}
+        return cls._instance
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def start(self):
+        return time.perf_counter() if self.enabled else None
+
+    def stop(self, stage, t0):
+        if t0 is None:
+            return
+        self.record(stage, time.perf_counter() - t0)
+
+    def record(self, stage, seconds):
+        """Regista uma amostra (em segundos) da etapa; seguro entre threads."""
+        if not self.enabled:
+            return
+        with self._lock:
+            ring = self._samples.get(stage)
+            if ring is None:
+                ring = self._samples[stage] = [np.zeros(self.window), 0]
+            buf, count = ring
+            buf[count % self.window] = seconds
+            ring[1] = count + 1
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+    def percentiles(self, stage):
+        """{'count', 'p50', 'p95', 'p99', 'max'} da etapa, em ms (None sem amostras)."""
+        with self._lock:
+            ring = self._samples.get(stage)
+            if ring is None:
+                return None
+            buf, count = ring
+            values = buf[:min(count, self.window)].copy()
+        p50, p95, p99 = np.percentile(values, (50, 95, 99)) * 1000
+        return {'count': count, 'p50': float(p50), 'p95': float(p95), 'p99': float(p99),
+                'max': float(values.max() * 1000)}
+
+    def snapshot(self):
+        """Percentis de todas as etapas com amostras, pela ordem de LATENCY_STAGES."""
+        with self._lock:
+            stages = list(self._samples.keys())
+        ordered = [s for s in LATENCY_STAGES if s in stages] + [s for s in stages if s not in LATENCY_STAGES]
+        return {stage: self.percentiles(stage) for stage in ordered}
+
+    def format_table(self):
+        """Tabela de texto para o painel da UI."""
+        lines = [f"{'etapa':<10}{'p50':>7}{'p95':>7}{'p99':>7}{'n':>7}"]
+        for stage, p in self.snapshot().items():
+            lines.append(f"{stage:<10}{p['p50']:>7.1f}{p['p95']:>7.1f}{p['p99']:>7.1f}{p['count']:>7}")
+        return "\n".join(lines)
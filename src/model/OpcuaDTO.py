@@ -1,49 +1,123 @@
+import threading
+
+
 class OpcuaDTO:
     """
     Data Transfer Object (Singleton) para gerenciar o estado das variáveis do PLC.
     Atua como fonte única de verdade para a interface gráfica.
+
+    É escrito pela thread do PLC (SubHandler) e lido pela thread do Tkinter,
+    por isso todo o estado está protegido por um RLock. Cada variável tem uma
+    versão (incrementada a cada atualização) e um contador de mudanças de
+    valor; `version` é a versão global do store. Os observers registam-se só
+    para os node_ids que lhes interessam e são chamados fora do lock.
     """
     _instance = None
 
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(OpcuaDTO, cls).__new__(cls)
+            cls._instance._lock = threading.RLock()
             cls._instance._variables = {}
-            cls._instance._observers = []
+            cls._instance._timestamps = {}
+            cls._instance._versions = {}
+            cls._instance._changes = {}
+            cls._instance.version = 0
+            cls._instance._subscriptions = {}      # callback -> frozenset de node_ids (None = todos)
+            cls._instance._by_node = {}            # node_id -> tuple de callbacks
+            cls._instance._wildcard = ()           # callbacks de todas as variáveis
         return cls._instance
 
-    def set_variable(self, node_id, value):
-        """Atualiza o valor e notifica observadores."""
+    def set_variable(self, node_id, value, timestamp=None):
+        """
+        Atualiza o valor e notifica observadores.
+        timestamp: SourceTimestamp da mudança no PLC (segundos, como time.time()).
+        """
         # Normaliza o valor para evitar lidar com objetos complexos na UI
         final_val = value
         if hasattr(value, 'Value'):
              final_val = value.Value.Value
-        
+
         # Atualiza o estado
-        self._variables[node_id] = final_val
-        self._notify(node_id, final_val)
+        with self._lock:
+            if node_id not in self._variables or self._variables[node_id] != final_val:
+                self._changes[node_id] = self._changes.get(node_id, 0) + 1
+            self._variables[node_id] = final_val
+            self._timestamps[node_id] = timestamp
+            self._versions[node_id] = self._versions.get(node_id, 0) + 1
+            self.version += 1
+            callbacks = self._by_node.get(node_id, ()) + self._wildcard
+        self._notify(callbacks, node_id, final_val)
 
     def get_variable(self, node_id):
-        if self.isVariableSet(node_id):
-            return self._variables.get(node_id)
-        else:
-            raise KeyError(f"Variável '{node_id}' não encontrada no OpcuaDTO.")
-    
+        with self._lock:
+            if node_id in self._variables:
+                return self._variables[node_id]
+        raise KeyError(f"Variável '{node_id}' não encontrada no OpcuaDTO.")
+
+    def get_timestamp(self, node_id):
+        """Instante (time.time()) da última mudança no PLC, ou None se desconhecido."""
+        with self._lock:
+            return self._timestamps.get(node_id)
+
+    def get_version(self, node_id):
+        """Número de atualizações recebidas da variável (0 se nunca foi escrita)."""
+        with self._lock:
+            return self._versions.get(node_id, 0)
+
+    def get_change_count(self, node_id):
+        """Número de vezes que o valor da variável mudou."""
+        with self._lock:
+            return self._changes.get(node_id, 0)
+
     def isVariableSet(self, node_id):
-        return node_id in self._variables
+        with self._lock:
+            return node_id in self._variables
 
-    def add_observer(self, callback):
-        """Registra uma função callback(node_id, value) para receber atualizações."""
-        if callback not in self._observers:
-            self._observers.append(callback)
+    def snapshot(self, node_ids=None):
+        """
+        Valores de várias variáveis lidos de uma só vez (consistentes entre si).
+        Retorna (valores, versão): {node_id: valor} só com as variáveis já
+        conhecidas e a versão global do store nesse instante.
+        """
+        with self._lock:
+            if node_ids is None:
+                values = dict(self._variables)
+            else:
+                values = {n: self._variables[n] for n in node_ids if n in self._variables}
+            return values, self.version
+
+    def add_observer(self, callback, node_ids=None):
+        """
+        Registra uma função callback(node_id, value) para receber atualizações
+        dos node_ids indicados (None: de todas as variáveis). Registar de novo o
+        mesmo callback substitui a lista de node_ids.
+        """
+        with self._lock:
+            self._subscriptions[callback] = None if node_ids is None else frozenset(node_ids)
+            self._rebuild()
 
     def remove_observer(self, callback):
-        if callback in self._observers:
-            self._observers.remove(callback)
+        with self._lock:
+            if self._subscriptions.pop(callback, False) is not False:
+                self._rebuild()
+
+    def _rebuild(self):
+        """Recalcula as tabelas de despacho (com o lock; só muda ao (des)registar)."""
+        by_node = {}
+        wildcard = []
+        for callback, node_ids in self._subscriptions.items():
+            if node_ids is None:
+                wildcard.append(callback)
+                continue
+            for node_id in node_ids:
+                by_node.setdefault(node_id, []).append(callback)
+        self._by_node = {node_id: tuple(cbs) for node_id, cbs in by_node.items()}
+        self._wildcard = tuple(wildcard)
 
-    def _notify(self, node_id, value):
-        for callback in self._observers:
+    def _notify(self, callbacks, node_id, value):
+        for callback in callbacks:
             try:
                 callback(node_id, value)
             except Exception as e:
-                print(f"Erro no observer OpcuaDTO: {e}")
\ No newline at end of file
+                print(f"Erro no observer OpcuaDTO: {e}")
@@ -3,6 +3,9 @@ from tkinter import ttk
 import json
 import os
 
+# Chaves de perfil sem widget na PaginaVideo: são guardadas em page_video.profile_options
+PROFILE_OPTION_KEYS = ("color_thresholds", "class_targets", "roi", "min_circularity", "motion_threshold")
+
 
 class PaginaFunctions(ttk.Frame):
     def __init__(self, parent, controller):
@@ -118,6 +121,7 @@ class PaginaFunctions(ttk.Frame):
             update_slider(page_video.slider_circle_param2, circle_params[3])
             update_slider(page_video.slider_circle_min_radius, circle_params[4])
             update_slider(page_video.slider_circle_max_radius, circle_params[5])
+            update_slider(page_video.slider_pyramid_levels, profile.get("pyramid_levels", 0))
 
             # Atualiza Blur
             update_slider(page_video.slider_blur, profile.get("blur", 1))
@@ -126,6 +130,8 @@ class PaginaFunctions(ttk.Frame):
             page_video.check_contour.set(profile.get("contour", True))
             page_video.check_inverseMask.set(profile.get("inverse_mask", False))
             page_video.var_type_of_segmentation.set(profile.get("segmentation_type", "by_color"))
+            page_video.var_circle_engine.set(profile.get("circle_engine", "hough"))
+            page_video.set_profile_options({k: profile[k] for k in PROFILE_OPTION_KEYS if k in profile})
 
             # Atualiza Campos de Texto (Perfil e Descrição)
             page_video.entry_profile.delete(0, tk.END)
@@ -125,6 +125,15 @@ class PaginaFile(ttk.Frame):
         
         try:
             if hasattr(self.controller, 'cap'):
+                video_controllers = []
+                if hasattr(self.controller, 'frames'):
+                    video_controllers = [frame.video_controller for frame in self.controller.frames.values()
+                                         if hasattr(frame, 'video_controller')]
+
+                # Para as threads de captura antes de libertar a câmera que elas estão a ler
+                for video_controller in video_controllers:
+                    video_controller.grabber.stop()
+
                 if self.controller.cap is not None:
                     self.controller.cap.release()
                 
@@ -135,10 +144,10 @@ class PaginaFile(ttk.Frame):
                     self.controller.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
                 
                 # Atualiza VideoController em qualquer tela que o tenha
-                if hasattr(self.controller, 'frames'):
-                    for frame in self.controller.frames.values():
-                        if hasattr(frame, 'video_controller'):
-                            frame.video_controller.cap = self.controller.cap
+                for video_controller in video_controllers:
+                    video_controller.set_capture(self.controller.cap, source)
+                    if video_controller.running:
+                        video_controller.grabber.start()
                 
                 status = "Aberta" if self.controller.cap.isOpened() else "Falha ao abrir"
                 self.log(f"Câmera aplicada. Status: {status}")
@@ -121,8 +121,13 @@ class StatusWindow(ttk.Frame):
     def iniciar_monitoramento(self):
         # Inicia o processo de monitoramento.
         self.load_config_and_build_ui()  # Recarrega configurações.
-        # Registra esta janela como observadora do DTO
-        OpcuaDTO().add_observer(self.update_ui_callback)
+        # Registra esta janela como observadora do DTO, só para as variáveis da tabela
+        dto = OpcuaDTO()
+        dto.add_observer(self.update_ui_callback, self.vars_ui.keys())
+        # Estado atual (lido de uma vez) enquanto não chegam novas notificações
+        values, _ = dto.snapshot(self.vars_ui.keys())
+        for node_id, value in values.items():
+            self._update_checkbox(node_id, value)
         self.monitoring = True  # Ativa a flag.
         
         # Verifica se o serviço compartilhado está conectado
@@ -0,0 +1,80 @@
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageTk
+
+
+class FrameRenderer:
+    """
+    Mostra frames do OpenCV num Label do Tkinter com o mínimo de alocações.
+
+    Redimensiona primeiro (cv2.INTER_AREA) para o tamanho do label e converte
+    a cor já no tamanho de exibição, ambos para buffers reutilizados que só
+    são realocados quando o tamanho muda. Enquanto o tamanho não muda,
+    atualiza o mesmo PhotoImage com paste() em vez de criar um novo. A taxa
+    de exibição é limitada por max_fps, independentemente da taxa de
+    processamento.
+    """
+    def __init__(self, label, max_fps=30):
+        self.label = label
+        self.max_fps = max_fps
+        self._photo = None
+        self._photo_size = None
+        self._resized = None      # Buffer do frame redimensionado (BGR ou cinza)
+        self._rgb = None          # Buffer RGB no tamanho de exibição
+        self._last_render = 0.0
+        self.geometry = None      # (escala, deslocamento x, deslocamento y) da última imagem
+        self.stats = {'rendered': 0, 'skipped': 0}
+
+    def clear(self):
+        """Remove a imagem do label; o próximo render cria um PhotoImage novo."""
+        self.label.configure(image="")
+        self.label.imgtk = None
+        self._photo = None
+        self._photo_size = None
+
+    def render(self, cv_image, box_w, box_h, force=False):
+        """
+        Desenha cv_image (BGR ou cinza) ajustada a box_w x box_h, mantendo a proporção.
+        Retorna False se o frame foi ignorado pelo limite de max_fps.
+        """
+        now = time.perf_counter()
+        if not force and self.max_fps and now - self._last_render < 1.0 / self.max_fps:
+            self.stats['skipped'] += 1
+            return False
+        self._last_render = now
+
+        h_orig, w_orig = cv_image.shape[:2]
+        ratio, new_w, new_h = 1.0, w_orig, h_orig
+        if box_w > 10 and box_h > 10:
+            # Descobrimos o "menor fator de escala" para garantir que a imagem caiba inteira
+            ratio = min(box_w / w_orig, box_h / h_orig)
+            new_w, new_h = max(1, int(w_orig * ratio)), max(1, int(h_orig * ratio))
+            if (new_w, new_h) != (w_orig, h_orig):
+                interpolation = cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR
+                shape = (new_h, new_w) + cv_image.shape[2:]
+                if self._resized is None or self._resized.shape != shape or self._resized.dtype != cv_image.dtype:
+                    self._resized = np.empty(shape, cv_image.dtype)
+                cv_image = cv2.resize(cv_image, (new_w, new_h), dst=self._resized, interpolation=interpolation)
+
+        # Conversão de cor já no tamanho final, para um buffer reutilizado
+        if self._rgb is not None and self._rgb.shape[:2] != (new_h, new_w):
+            self._rgb = None
+        code = cv2.COLOR_GRAY2RGB if cv_image.ndim == 2 else cv2.COLOR_BGR2RGB
+        self._rgb = cv2.cvtColor(cv_image, code, dst=self._rgb)
+        pil_img = Image.frombuffer("RGB", (new_w, new_h), self._rgb, "raw", "RGB", 0, 1)
+
+        if self._photo is None or self._photo_size != (new_w, new_h):
+            self._photo = ImageTk.PhotoImage(image=pil_img)
+            self._photo_size = (new_w, new_h)
+            self.label.imgtk = self._photo
+            self.label.configure(image=self._photo)
+        else:
+            self._photo.paste(pil_img)
+
+        # O label centra a imagem: guarda a geometria para mapear cliques para o frame
+        label_w, label_h = self.label.winfo_width(), self.label.winfo_height()
+        self.geometry = (ratio, max(0, (label_w - new_w) // 2), max(0, (label_h - new_h) // 2))
+        self.stats['rendered'] += 1
+        return True
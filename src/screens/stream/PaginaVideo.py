@@ -1,10 +1,14 @@
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
-import cv2
 import json
 import os
 from src.controller.VideoController import VideoController
+from src.model.LatencyMonitor import LatencyMonitor
+from src.controller.util.RegionOfInterest import RegionOfInterest
+from src.screens.stream.FrameRenderer import FrameRenderer
+
+# Limite de atualização do vídeo na GUI (o processamento pode correr mais rápido)
+DISPLAY_MAX_FPS = 30
 
 
 class PaginaVideo(ttk.Frame):
@@ -20,8 +24,19 @@ class PaginaVideo(ttk.Frame):
         self.var_forma = tk.StringVar(value="square")
         self.var_imagem_tipo = tk.StringVar(value="img_resultado")
         self.var_type_of_segmentation = tk.StringVar(value="by_color")
+        self.var_circle_engine = tk.StringVar(value="hough")
         self.var_mode_trigger = tk.BooleanVar(value=False)
         self.var_trigger_name = tk.StringVar(value="CamaraS")
+        self.var_trigger_edge = tk.BooleanVar(value=False)
+        self.var_latency = tk.BooleanVar(value=False)
+        # Opções do perfil sem widget próprio (ex.: color_thresholds, class_targets),
+        # preservadas ao aplicar e ao salvar um perfil
+        self.profile_options = {}
+        self.var_roi = tk.StringVar(value="")
+        self.var_roi_draw = tk.BooleanVar(value=False)
+        self._roi_drag_start = None
+        # Escala e deslocamento da última imagem mostrada (label -> coordenadas do frame)
+        self._display_geometry = None
         
         # --- LAYOUT PRINCIPAL (2 Colunas) ---
         # Coluna Esquerda: Vídeo + Botões Ação
@@ -75,8 +90,13 @@ class PaginaVideo(ttk.Frame):
 
     def setup_video_area(self):
         # 1. Label do Vídeo
-        self.lbl_video = ttk.Label(self.frame_video_area, text="Sem Sinal de Vídeo")
+        self.lbl_video = ttk.Label(self.frame_video_area, text="Sem Sinal de Vídeo", anchor="center")
         self.lbl_video.pack(fill="both", expand=True, pady=(0, 10))
+        # Desenho de ROI arrastando o rato sobre o vídeo
+        self.lbl_video.bind("<ButtonPress-1>", self._on_roi_press)
+        self.lbl_video.bind("<ButtonRelease-1>", self._on_roi_release)
+        # Exibição com PhotoImage reutilizado e taxa limitada
+        self.renderer = FrameRenderer(self.lbl_video, max_fps=DISPLAY_MAX_FPS)
         
         # 2. Botões (Get Image / Clean Image)
         frame_botoes = ttk.Frame(self.frame_video_area)
@@ -158,17 +178,43 @@ class PaginaVideo(ttk.Frame):
         self.slider_circle_param2 = self.create_labeled_slider(box_circle, "Param2", 0, 100, 25)
         self.slider_circle_min_radius = self.create_labeled_slider(box_circle, "Min R", 0, 100, 10)
         self.slider_circle_max_radius = self.create_labeled_slider(box_circle, "Max R", 0, 200, 100)
+        # Níveis da pirâmide (0 = resolução completa; n = deteção em 1/2**n e refinamento local)
+        self.slider_pyramid_levels = self.create_labeled_slider(box_circle, "Pyr", 0, 3, 0)
+
+        # Motor de deteção de círculos
+        frame_engine = ttk.Frame(box_circle)
+        frame_engine.pack(fill="x", padx=5, pady=2)
+        ttk.Label(frame_engine, text="Engine").pack(side="left")
+        for text, value in (("Hough", "hough"), ("Contour", "contour"), ("Hybrid", "hybrid")):
+            ttk.Radiobutton(frame_engine, text=text, variable=self.var_circle_engine, value=value, command=self.ao_mexer_slider).pack(side="left", padx=5)
 
         # 8. Trigger Mode
         box_trigger = ttk.LabelFrame(self.frame_controls, text="Trigger Mode")
         box_trigger.pack(fill="x", pady=5)
         
-        ttk.Checkbutton(box_trigger, text="Enable Trigger Mode", variable=self.var_mode_trigger).pack(anchor="w", padx=5, pady=2)
+        ttk.Checkbutton(box_trigger, text="Enable Trigger Mode", variable=self.var_mode_trigger, command=self.ao_mudar_trigger).pack(anchor="w", padx=5, pady=2)
+        ttk.Checkbutton(box_trigger, text="Inspecionar só na borda do trigger", variable=self.var_trigger_edge).pack(anchor="w", padx=5, pady=2)
         
         frame_trig_entry = ttk.Frame(box_trigger)
         frame_trig_entry.pack(fill="x", padx=5, pady=2)
         ttk.Label(frame_trig_entry, text="Var Name:").pack(side="left")
-        ttk.Entry(frame_trig_entry, textvariable=self.var_trigger_name).pack(side="left", fill="x", expand=True, padx=5)
+        entry_trigger = ttk.Entry(frame_trig_entry, textvariable=self.var_trigger_name)
+        entry_trigger.pack(side="left", fill="x", expand=True, padx=5)
+        # O nó do trigger só muda quando o nome é confirmado, não a cada tecla
+        entry_trigger.bind("<Return>", lambda e: self.video_controller.aplicar_trigger())
+        entry_trigger.bind("<FocusOut>", lambda e: self.video_controller.aplicar_trigger())
+
+        # 9. Região de Interesse (ROI)
+        box_roi = ttk.LabelFrame(self.frame_controls, text="ROI (x,y,w,h ; x1,y1,x2,y2,x3,y3...)")
+        box_roi.pack(fill="x", pady=5)
+        entry_roi = ttk.Entry(box_roi, textvariable=self.var_roi)
+        entry_roi.pack(fill="x", padx=5, pady=2)
+        entry_roi.bind("<Return>", lambda e: self.apply_roi_text())
+        frame_roi_btn = ttk.Frame(box_roi)
+        frame_roi_btn.pack(fill="x", padx=5, pady=2)
+        ttk.Checkbutton(frame_roi_btn, text="Desenhar no vídeo", variable=self.var_roi_draw).pack(side="left")
+        ttk.Button(frame_roi_btn, text="Aplicar", command=self.apply_roi_text).pack(side="left", padx=5)
+        ttk.Button(frame_roi_btn, text="Limpar", command=self.clear_roi).pack(side="left")
 
         # 4. Contour & Blur Config (Lado a Lado)
         frame_configs = ttk.Frame(self.frame_controls)
@@ -193,6 +239,7 @@ class PaginaVideo(ttk.Frame):
         ttk.Radiobutton(type_of_segmentation, text="By Color", variable=self.var_type_of_segmentation, value="by_color", command=self.ao_mexer_slider).pack(anchor="w", padx=10)
         ttk.Radiobutton(type_of_segmentation, text="By Limiar", variable=self.var_type_of_segmentation, value="by_limiar", command=self.ao_mexer_slider).pack(anchor="w", padx=10)
         ttk.Radiobutton(type_of_segmentation, text="By Shape", variable=self.var_type_of_segmentation, value="by_shape", command=self.ao_mexer_slider).pack(anchor="w", padx=10)
+        ttk.Radiobutton(type_of_segmentation, text="By Class (Red/Blue/White)", variable=self.var_type_of_segmentation, value="by_class", command=self.ao_mexer_slider).pack(anchor="w", padx=10)
 
 
         # 5. Profile & Description
@@ -214,9 +261,41 @@ class PaginaVideo(ttk.Frame):
         ttk.Radiobutton(box_view, text="Mask Raw", variable=self.var_imagem_tipo, value="mask", command=self.ao_mexer_slider).pack(anchor="w", padx=10)
         ttk.Radiobutton(box_view, text="Original Frozen", variable=self.var_imagem_tipo, value="imagem_congelada", command=self.ao_mexer_slider).pack(anchor="w", padx=10)
 
+        # 7. Latência por etapa (p50/p95/p99 em ms)
+        box_latency = ttk.LabelFrame(self.frame_controls, text="Latência (ms)")
+        box_latency.pack(fill="x", pady=5)
+        frame_latency_btn = ttk.Frame(box_latency)
+        frame_latency_btn.pack(fill="x", padx=5, pady=2)
+        ttk.Checkbutton(frame_latency_btn, text="Medir", variable=self.var_latency, command=self.toggle_latency).pack(side="left")
+        ttk.Button(frame_latency_btn, text="Reset", command=LatencyMonitor().reset).pack(side="right")
+        self.lbl_latency = ttk.Label(box_latency, text="", font=("Courier", 8), justify="left")
+        self.lbl_latency.pack(anchor="w", padx=5, pady=2)
+
         # Botão para salvar configuração
         ttk.Button(self.frame_controls, text="Salvar Configuração", command=self.save_configuration).pack(fill="x", pady=10)
 
+    def toggle_latency(self):
+        """Liga/desliga a medição de latência e o refresco do painel."""
+        LatencyMonitor().enable(self.var_latency.get())
+        if self.var_latency.get():
+            self._atualizar_painel_latencia()
+
+    def _atualizar_painel_latencia(self):
+        if not self.var_latency.get():
+            return
+        gate = self.video_controller.motion_gate.stats
+        edges = self.video_controller.edge_stats
+        hist = self.video_controller.grabber.get_history_stats()
+        hs = self.video_controller.handshake.metrics()
+        self.lbl_latency.configure(text=LatencyMonitor().format_table() +
+                                   f"\nframes: {gate['processed']} processados, {gate['skipped']} sem movimento"
+                                   f"\ntrigger: {edges['edges']} bordas, {edges['inspections']} inspeções"
+                                   f"\nhistórico: {hist['frames']} frames, {hist['hits']} hits, {hist['misses']} misses,"
+                                   f" idade {hist['age_ms']:.0f} ms"
+                                   f"\nhandshake: {hs['state']}, {hs['cycles']} ciclos, {sum(hs['missed'].values())} perdidos,"
+                                   f" {hs['retries']} repetições")
+        self.after(500, self._atualizar_painel_latencia)
+
     def save_configuration(self):
         """Salva as configurações atuais num ficheiro JSON, adicionando um novo perfil."""
         profile_name = self.entry_profile.get()
@@ -224,7 +303,8 @@ class PaginaVideo(ttk.Frame):
             print("Erro: O campo Profile é obrigatório.")
             return
 
-        new_data = {
+        new_data = dict(self.profile_options)
+        new_data.update({
             "profile": profile_name,
             "description": self.entry_desc.get(),
             "hsv_min": [self.slider_Hue_min.get(), self.slider_Sat_min.get(), self.slider_Value_min.get()],
@@ -241,8 +321,10 @@ class PaginaVideo(ttk.Frame):
                 self.slider_circle_param2.get(),
                 self.slider_circle_min_radius.get(),
                 self.slider_circle_max_radius.get()
-            ]
-        }
+            ],
+            "pyramid_levels": int(round(self.slider_pyramid_levels.get())),
+            "circle_engine": self.var_circle_engine.get()
+        })
 
         file_path = "plc_config.json"
         data = {}
@@ -272,12 +354,62 @@ class PaginaVideo(ttk.Frame):
             json.dump(data, f, indent=4)
 
 
+    # --- REGIÃO DE INTERESSE ---
+
+    def set_profile_options(self, options):
+        """Aplica as opções de perfil sem widget próprio (chamado ao carregar um perfil)."""
+        self.profile_options = dict(options)
+        self.var_roi.set(RegionOfInterest(self.profile_options.get("roi")).to_text())
+
+    def set_roi(self, roi):
+        if roi.is_empty():
+            self.profile_options.pop("roi", None)
+        else:
+            self.profile_options["roi"] = roi.to_list()
+        self.var_roi.set(roi.to_text())
+        self.ao_mexer_slider()
+
+    def apply_roi_text(self):
+        try:
+            self.set_roi(RegionOfInterest.from_text(self.var_roi.get()))
+        except ValueError:
+            print(f"Erro: ROI inválida '{self.var_roi.get()}'.")
+
+    def clear_roi(self):
+        self.set_roi(RegionOfInterest())
+
+    def _label_to_frame(self, x, y):
+        """Converte coordenadas do label de vídeo para coordenadas do frame original."""
+        scale, off_x, off_y = self._display_geometry
+        return int((x - off_x) / scale), int((y - off_y) / scale)
+
+    def _on_roi_press(self, event):
+        if self.var_roi_draw.get() and self._display_geometry is not None:
+            self._roi_drag_start = self._label_to_frame(event.x, event.y)
+
+    def _on_roi_release(self, event):
+        if self._roi_drag_start is None:
+            return
+        (xa, ya), (xb, yb) = self._roi_drag_start, self._label_to_frame(event.x, event.y)
+        self._roi_drag_start = None
+        rect = [min(xa, xb), min(ya, yb), abs(xb - xa), abs(yb - ya)]
+        if rect[2] > 2 and rect[3] > 2:
+            # Cada arrasto acrescenta um retângulo à ROI atual
+            self.set_roi(RegionOfInterest(self.profile_options.get("roi", []) + [rect]))
+
     # --- LÓGICA DE VÍDEO E EVENTOS ---
 
     def ao_mexer_slider(self, _=None):
-        """Chamado quando arrastamos um slider. Só atualiza se tivermos uma imagem capturada."""
-        if self.video_controller.modo_estatico and self.video_controller.imagem_congelada is not None:
-            self.video_controller.atualizar_processamento()
+        """
+        Chamado por qualquer controlo da página. Só atualiza se tivermos uma imagem
+        capturada; o controller junta rajadas de eventos num só processamento.
+        """
+        self.video_controller.atualizar_processamento()
+
+    def ao_mudar_trigger(self):
+        """Liga/desliga o modo trigger: confirma a variável do trigger e reprocessa."""
+        self.video_controller.aplicar_trigger()
+        self.ao_mexer_slider()
 
     def iniciar_video(self):
         """Wrapper para manter compatibilidade com app.py"""
@@ -287,50 +419,34 @@ class PaginaVideo(ttk.Frame):
         """Wrapper para manter compatibilidade com app.py"""
         self.video_controller.parar()
 
-    def atualizar_visualizacao_final(self, img_resultado, mask, mask_clean, imagem_congelada):
+    def atualizar_visualizacao_final(self, img_resultado, mask, mask_clean, imagem_congelada, force=False):
         """
         Recebe as imagens processadas do Controller e decide qual mostrar
         baseado no RadioButton selecionado na GUI.
+        force ignora o limite de fps da exibição (ex.: imagem estática).
         """
         tipo = self.var_imagem_tipo.get()
         if tipo == "mask":
-            self.mostrar_imagem_no_label(mask)
+            imagem = mask
         elif tipo == "mask_clean":
-            self.mostrar_imagem_no_label(mask_clean)
+            imagem = mask_clean
         elif tipo == "imagem_congelada" and imagem_congelada is not None:
-            self.mostrar_imagem_no_label(imagem_congelada)
-        else:
-            self.mostrar_imagem_no_label(img_resultado)
-
-    def mostrar_imagem_no_label(self, cv_image):
-        """Função auxiliar para converter CV2(BGR) -> Tkinter e exibir"""
-        # Converter BGR para RGB
-        if len(cv_image.shape) == 2:
-            rgb_image = cv2.cvtColor(cv_image, cv2.COLOR_GRAY2RGB)
+            imagem = imagem_congelada
         else:
-            rgb_image = cv2.cvtColor(cv_image, cv2.COLOR_BGR2RGB)
-        
-        # Obtemos as dimensões originais da imagem
-        h_orig, w_orig = rgb_image.shape[:2]
-
-        # Redimensionar para caber na área de vídeo (Responsivo)
-        # Pegamos a largura atual do frame de video (container)
+            imagem = img_resultado
+        # Um resultado pedido antes de mudar a vista pode não ter esta saída:
+        # mantém-se a imagem anterior até chegar o próximo
+        if imagem is not None:
+            self.mostrar_imagem_no_label(imagem, force)
+
+    def mostrar_imagem_no_label(self, cv_image, force=False):
+        """Exibe um frame CV2 (BGR ou cinza) no label de vídeo, ajustado à área disponível"""
+        # Pegamos o tamanho atual do frame de video (container)
         container_w = self.frame_video_area.winfo_width()
         container_h = self.frame_video_area.winfo_height() - 60 # Desconta botões
-        
-        if container_w > 10 and container_h > 10: 
-             # Cálculo para manter o Aspect Ratio (Proporção)
-             # Descobrimos o "menor fator de escala" para garantir que a imagem caiba inteira
-             ratio = min(container_w / w_orig, container_h / h_orig)
-             
-             new_w = int(w_orig * ratio)
-             new_h = int(h_orig * ratio)
-             
-             pil_img = Image.fromarray(rgb_image)
-             pil_img = pil_img.resize((new_w, new_h), Image.Resampling.LANCZOS)
-        else:
-             pil_img = Image.fromarray(rgb_image)
-
-        imgtk = ImageTk.PhotoImage(image=pil_img)
-        self.lbl_video.imgtk = imgtk
-        self.lbl_video.configure(image=imgtk)
\ No newline at end of file
+        monitor = LatencyMonitor()
+        t0 = monitor.start()
+        if self.renderer.render(cv_image, container_w, container_h, force=force):
+            monitor.stop("display", t0)
+            # Geometria usada para mapear cliques (ROI) para o frame
+            self._display_geometry = self.renderer.geometry
@@ -0,0 +1,109 @@
+"""
+Benchmark de memória e alocações da cadeia de processamento.
+
+Corre processar_frame sobre frames sintéticos sem BufferPool, com um pool
+de saídas e intermédios (2 gerações) e com o pool dos workers do
+ProcessingPipeline (só intermédios) e mede com tracemalloc (o numpy regista
+aí as alocações dos arrays, incluindo as saídas do OpenCV):
+  - memória nova pedida por frame em regime estacionário (pico acima do
+    que já estava alocado antes do frame: temporários e saídas novas);
+  - crescimento da memória ao longo do regime estacionário (deve ser ~0);
+  - memória retida pelo pool;
+  - tempo médio por frame.
+
+Uso (na raiz do repositório):
+    python -m tests.bench_allocations
+"""
+import time
+import tracemalloc
+
+from src.controller.ProcessingPipeline import WORKER_POOL_GENERATIONS, processar_frame
+from src.controller.util.BufferPool import BufferPool
+from tests.synthetic_frames import hough_params_for, make_frame
+
+RESOLUTIONS = [(640, 480), (1920, 1080)]
+SEGMENTATIONS = ["by_color", "by_limiar", "by_class"]
+N_FRAMES = 20
+WARMUP = 5
+# Modo do pool -> gerações do BufferPool (None: sem pool)
+POOLS = {"não": None, "2 ger": 2, "worker": WORKER_POOL_GENERATIONS}
+
+
+def params_for(width, height, segmentation, roi=None):
+    params = {
+        "hsv_min": (0, 0, 70),
+        "hsv_max": (179, 255, 255),
+        "threshold": (70, 255),
+        "blur": 3,
+        "inverse_mask": False,
+        "segmentation_type": segmentation,
+        "circle_hough": hough_params_for(width, height),
+        "circle_engine": "contour",
+    }
+    if roi:
+        params["roi"] = roi
+    return params
+
+
+def measure(frames, params, pool):
+    # O aquecimento preenche todas as gerações do pool
+    warmup = WARMUP + (pool.generations if pool is not None else 0)
+    for i in range(warmup):
+        if pool is not None:
+            pool.next_generation()
+        processar_frame(frames[i % len(frames)], params, pool)
+
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    transient = []
+    for i in range(N_FRAMES):
+        if pool is not None:
+            pool.next_generation()
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        result = processar_frame(frames[i % len(frames)], params, pool)
+        _, peak = tracemalloc.get_traced_memory()
+        # Memória nova que o frame precisou (temporários + saídas alocadas de novo)
+        transient.append(peak - before)
+        del result
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return sum(transient) / N_FRAMES, max(transient), end - start
+
+
+def run():
+    print(f"{'resolução':>11} {'segmentação':>11} {'roi':>4} {'pool':>6} {'KiB/frame':>10} {'máx KiB':>9} "
+          f"{'Δ KiB':>7} {'pool MiB':>9}")
+    for width, height in RESOLUTIONS:
+        frames = [make_frame(width, height, 20, seed=s)[0] for s in range(4)]
+        for segmentation in SEGMENTATIONS:
+            for roi in (None, [[width // 8, height // 8, width // 2, height // 2]]):
+                params = params_for(width, height, segmentation, roi)
+                for mode, generations in POOLS.items():
+                    pool = None if generations is None else BufferPool(generations=generations)
+                    per_frame, worst, growth = measure(frames, params, pool)
+                    retained = pool.nbytes() / 2 ** 20 if pool else 0.0
+                    print(f"{width:>5}x{height:<5} {segmentation:>11} {'sim' if roi else 'não':>4} "
+                          f"{mode:>6} {per_frame / 1024:>10.1f} {worst / 1024:>9.1f} "
+                          f"{growth / 1024:>7.1f} {retained:>9.1f}")
+
+    # O tempo é medido à parte, sem o custo do tracemalloc
+    print(f"\n{'resolução':>11} {'pool':>6} {'ms/frame':>9}")
+    for width, height in RESOLUTIONS:
+        frames = [make_frame(width, height, 20, seed=s)[0] for s in range(4)]
+        params = params_for(width, height, "by_color")
+        for mode, generations in POOLS.items():
+            pool = None if generations is None else BufferPool(generations=generations)
+            for frame in frames:
+                processar_frame(frame, params, pool)
+            t0 = time.perf_counter()
+            for i in range(N_FRAMES):
+                if pool is not None:
+                    pool.next_generation()
+                processar_frame(frames[i % len(frames)], params, pool)
+            ms = (time.perf_counter() - t0) / N_FRAMES * 1000
+            print(f"{width:>5}x{height:<5} {mode:>6} {ms:>9.2f}")
+
+
+if __name__ == "__main__":
+    run()
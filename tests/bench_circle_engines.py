@@ -0,0 +1,70 @@
+"""
+Benchmark dos motores de deteção de círculos (hough | contour | hybrid).
+
+Corre os três motores de ProcessImage.find_circles sobre as mesmas
+máscaras de frames sintéticos e reporta, por resolução:
+  - throughput (frames/s) de cada motor;
+  - precisão face à verdade do gerador sintético;
+  - concordância entre motores (F1 da associação dos seus círculos).
+
+Uso (na raiz do repositório):
+    python -m tests.bench_circle_engines
+"""
+import itertools
+import time
+
+import numpy as np
+
+from src.controller.util.ProcessImage import ProcessImage
+from tests.synthetic_frames import hough_params_for, make_frame, match_circles
+
+ENGINES = ["hough", "contour", "hybrid"]
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+N_FRAMES = 8
+N_OBJECTS = 20
+
+
+def agreement(a, b):
+    """F1 entre as deteções de dois motores (cada um serve de referência ao outro)."""
+    if not a and not b:
+        return 1.0
+    if not a or not b:
+        return 0.0
+    recall = match_circles(a, [c + ("",) for c in b])["recall"]
+    precision = match_circles(b, [c + ("",) for c in a])["recall"]
+    return 2 * recall * precision / (recall + precision) if recall + precision else 0.0
+
+
+def run():
+    for width, height in RESOLUTIONS:
+        dp, min_dist, param1, param2, min_r, max_r = hough_params_for(width, height)
+        samples = []
+        for seed in range(N_FRAMES):
+            frame, truth = make_frame(width, height, N_OBJECTS, seed=seed)
+            processor = ProcessImage(frame, blur=3)
+            samples.append((processor, processor.remove_noise(processor.create_mask_by_threshold(70, 255)), truth))
+
+        found = {engine: [] for engine in ENGINES}
+        print(f"\n{width}x{height}  ({N_FRAMES} frames, {N_OBJECTS} peças)")
+        print(f"{'motor':>8} {'fps':>8} {'recall':>7} {'prec':>6} {'e_centro':>9} {'e_raio':>7}")
+        for engine in ENGINES:
+            processor, mask, _ = samples[0]
+            processor.find_circles(mask, engine, 0, dp, min_dist, param1, param2, min_r, max_r)  # aquecimento
+            t0 = time.perf_counter()
+            for processor, mask, _ in samples:
+                circles = processor.find_circles(mask, engine, 0, dp, min_dist, param1, param2, min_r, max_r)
+                found[engine].append([tuple(int(v) for v in c) for c in circles])
+            fps = N_FRAMES / (time.perf_counter() - t0)
+
+            scores = [match_circles(f, truth) for f, (_, _, truth) in zip(found[engine], samples)]
+            mean = {k: float(np.mean([s[k] for s in scores])) for k in scores[0]}
+            print(f"{engine:>8} {fps:>8.1f} {mean['recall']:>7.3f} {mean['precision']:>6.3f} "
+                  f"{mean['center_error']:>9.2f} {mean['radius_error']:>7.2f}")
+
+        for a, b in itertools.combinations(ENGINES, 2):
+            f1 = np.mean([agreement(x, y) for x, y in zip(found[a], found[b])])
+            print(f"  concordância {a} x {b}: {f1:.3f}")
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,154 @@
+"""
+Harness de latência ponta a ponta: captura do frame -> escrita concluída no PLC.
+
+Sobe o servidor OPC UA de teste (tests/opcua_server.py) numa thread própria,
+liga o SharedPLC real a ele e corre o mesmo caminho do vídeo ao vivo:
+FrameGrabber (fonte sintética ou vídeo gravado) -> ProcessingPipeline ->
+SharedPLC.write(..., timestamp) por cada frame com círculos detetados.
+O instante de captura viaja no frame até _write_value, que regista a
+latência "end_to_end" no LatencyMonitor; no fim é impressa a distribuição
+(p50/p95/p99) dessa e das restantes etapas.
+
+Uso (na raiz do repositório):
+    python -m tests.bench_plc_latency                          # 10 s, 640x480 a 30 fps
+    python -m tests.bench_plc_latency --duration 30 --width 1280 --height 720
+    python -m tests.bench_plc_latency --video resources/gravacao.mp4 --json resultado.json
+"""
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from src.controller.FrameGrabber import FrameGrabber
+from src.controller.ProcessingPipeline import ProcessingPipeline
+from src.controller.SharedPLC import SharedPLC
+from src.model.LatencyMonitor import LatencyMonitor
+from tests.opcua_server import create_server
+from tests.synthetic_frames import SyntheticCapture, hough_params_for
+
+SIGNAL = (4, "SinalPython")
+
+
+def start_server_thread(endpoint):
+    """Corre o servidor de teste num loop asyncio numa thread daemon. Retorna (thread, evento de paragem)."""
+    ready = threading.Event()
+    stop = threading.Event()
+
+    async def serve():
+        server, _ = await create_server(endpoint, monitor=False)
+        async with server:
+            ready.set()
+            while not stop.is_set():
+                await asyncio.sleep(0.05)
+
+    thread = threading.Thread(target=lambda: asyncio.run(serve()), daemon=True)
+    thread.start()
+    if not ready.wait(10):
+        raise RuntimeError(f"Servidor OPC UA não arrancou em {endpoint}")
+    return thread, stop
+
+
+def make_params(width, height):
+    return {
+        "hsv_min": (0, 0, 70),
+        "hsv_max": (179, 255, 255),
+        "threshold": (70, 255),
+        "blur": 5,
+        "inverse_mask": False,
+        "segmentation_type": "by_limiar",
+        "circle_hough": hough_params_for(width, height),
+        "pyramid_levels": 0,
+        "circle_engine": "hough",
+        # Como com o trigger ligado: só interessam os círculos para a lógica do PLC
+        "outputs": frozenset({"circles"}),
+    }
+
+
+def run(args):
+    monitor = LatencyMonitor()
+    monitor.reset()
+    monitor.enable()
+
+    server_thread, server_stop = start_server_thread(f"opc.tcp://127.0.0.1:{args.port}")
+    plc = SharedPLC()
+    plc.set_log_callback(lambda msg: None if msg.startswith("Escrito") else print(f"[PLC] {msg}"))
+    plc.start(f"opc.tcp://127.0.0.1:{args.port}")
+    deadline = time.perf_counter() + 10
+    while not plc.connected and time.perf_counter() < deadline:
+        time.sleep(0.05)
+    if not plc.connected:
+        raise RuntimeError("SharedPLC não ligou ao servidor de teste")
+
+    cap = SyntheticCapture(args.width, args.height, args.objects, fps=args.fps, path=args.video)
+    grabber = FrameGrabber(cap, "synthetic" if args.video is None else args.video)
+    pipeline = ProcessingPipeline(workers=args.workers)
+    params = make_params(args.width, args.height)
+
+    writes, value = [], True
+    grabber.start()
+    pipeline.start()
+    end = time.perf_counter() + args.duration
+    try:
+        # Mesmo papel do VideoController.loop, sem o Tkinter
+        while time.perf_counter() < end:
+            captured = grabber.get_latest()
+            if captured is not None:
+                pipeline.submit(captured, params)
+            for result in pipeline.get_results():
+                grabber.mark_processed()
+                if result.circle_detected:
+                    # Alterna o valor para cada escrita ser uma mudança real no servidor
+                    future = plc.write(*SIGNAL, value, result.timestamp)
+                    if future is not None:
+                        writes.append(future)
+                    value = not value
+            time.sleep(0.005)
+    finally:
+        grabber.stop()
+        pipeline.stop()
+        for future in writes:
+            future.result(5)
+        plc.stop()
+        if plc._thread is not None:
+            plc._thread.join(5)  # Fecha a sessão antes de parar o servidor
+        cap.release()
+        server_stop.set()
+        server_thread.join(5)
+
+    return {
+        "frames": grabber.get_stats(),
+        "pipeline": dict(pipeline.stats),
+        "writes": len(writes),
+        "latency_ms": monitor.snapshot(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latência captura -> escrita no PLC contra o servidor OPC UA de teste")
+    parser.add_argument("--duration", type=float, default=10.0, help="Duração em segundos")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--height", type=int, default=480)
+    parser.add_argument("--objects", type=int, default=8, help="Peças por frame sintético")
+    parser.add_argument("--fps", type=float, default=30.0, help="Ritmo da fonte de frames")
+    parser.add_argument("--video", default=None, help="Vídeo gravado em vez de frames sintéticos")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--port", type=int, default=48400, help="Porta do servidor OPC UA de teste")
+    parser.add_argument("--json", default=None, help="Grava o relatório neste ficheiro")
+    args = parser.parse_args()
+
+    report = run(args)
+    print(f"\nFrames: {report['frames']}  pipeline: {report['pipeline']}  escritas: {report['writes']}")
+    print(LatencyMonitor().format_table())
+    e2e = report["latency_ms"].get("end_to_end")
+    if e2e:
+        print(f"\nCaptura -> PLC: p50 {e2e['p50']:.1f} ms, p95 {e2e['p95']:.1f} ms, "
+              f"p99 {e2e['p99']:.1f} ms, máx {e2e['max']:.1f} ms ({e2e['count']} escritas)")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Relatório gravado em {args.json}")
+
+
+if __name__ == "__main__":
+    main()
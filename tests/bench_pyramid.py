@@ -0,0 +1,74 @@
+"""
+Benchmark da deteção de círculos em pirâmide contra a resolução completa.
+
+Para cada resolução, gera frames sintéticos determinísticos, segmenta-os
+uma vez e mede HoughCircles em resolução completa (levels=0) e em pirâmide
+(levels=1, 2). Reporta o tempo mediano, o speedup e a diferença de
+precisão (recall, precision, erro de centro e de raio) face à resolução
+completa.
+
+Os contornos não têm versão em pirâmide: o findContours em resolução
+completa é uma só passagem linear (~0.9 ms a 1080p com 20 peças) e
+localizar na escala reduzida e voltar a extrair cada contorno na sua janela
+custava o mesmo ou mais.
+
+Uso (na raiz do repositório):
+    python -m tests.bench_pyramid
+"""
+import time
+
+import numpy as np
+
+from src.controller.util.ProcessImage import ProcessImage
+from tests.synthetic_frames import hough_params_for, make_frame, match_circles
+
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+LEVELS = [0, 1, 2]
+N_FRAMES = 5
+N_OBJECTS = 20
+REPEAT = 5
+
+
+def median_time(fn, repeat=REPEAT):
+    fn()  # aquecimento
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times))
+
+
+def run():
+    print(f"{'resolução':>11} {'lvl':>3} {'ms':>8} {'speedup':>8} {'recall':>7} {'prec':>6} {'Δcentro':>8} {'Δraio':>7}")
+    for width, height in RESOLUTIONS:
+        hough = hough_params_for(width, height)
+        masks, truths = [], []
+        for seed in range(N_FRAMES):
+            frame, truth = make_frame(width, height, N_OBJECTS, seed=seed)
+            processor = ProcessImage(frame, blur=3)
+            masks.append((processor, processor.remove_noise(processor.create_mask_by_threshold(70, 255))))
+            truths.append(truth)
+
+        baseline = None
+        for levels in LEVELS:
+            elapsed = []
+            scores = []
+            for (processor, mask), truth in zip(masks, truths):
+                elapsed.append(median_time(lambda: processor.get_circles_pyramid(mask, levels, *hough)))
+                found = [tuple(int(v) for v in c) for c in processor.get_circles_pyramid(mask, levels, *hough)]
+                scores.append(match_circles(found, truth))
+
+            ms = float(np.mean(elapsed)) * 1000
+            score = {k: float(np.mean([s[k] for s in scores])) for k in scores[0]}
+            if baseline is None:
+                baseline = (ms, score)
+            base_ms, base_score = baseline
+            print(f"{width:>5}x{height:<5} {levels:>3} {ms:>8.2f} {base_ms / ms:>7.2f}x "
+                  f"{score['recall']:>7.3f} {score['precision']:>6.3f} "
+                  f"{score['center_error'] - base_score['center_error']:>+8.2f} "
+                  f"{score['radius_error'] - base_score['radius_error']:>+7.2f}")
+
+
+if __name__ == "__main__":
+    run()
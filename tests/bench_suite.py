@@ -0,0 +1,198 @@
+"""
+Suite de benchmarks reprodutível da cadeia de processamento.
+
+Mede cada etapa de ProcessImage e a cadeia completa executada por
+VideoController.atualizar_processamento (processar_frame) sobre frames
+sintéticos determinísticos, em várias resoluções e densidades de peças.
+Os resultados (mediana em ms de cada caso) são gravados em JSON e podem ser
+comparados com um baseline gravado: casos mais lentos do que o baseline por
+mais de --threshold (fração) são assinalados como regressão e o processo
+termina com código 1.
+
+Uso (na raiz do repositório):
+    python -m tests.bench_suite                                # corre e grava tests/bench_results/latest.json
+    python -m tests.bench_suite --save-baseline                # grava também tests/bench_results/baseline.json
+    python -m tests.bench_suite --compare tests/bench_results/baseline.json --threshold 0.2
+    python -m tests.bench_suite --quick                        # só a menor resolução/densidade
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from src.controller.ProcessingPipeline import STAGES, processar_frame
+from src.controller.StageGraph import StageGraph
+from src.controller.util.BufferPool import BufferPool
+from src.controller.util.ProcessImage import ProcessImage
+from tests.synthetic_frames import hough_params_for, make_frame
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "bench_results")
+RESOLUTIONS = [(640, 480), (1280, 720), (1920, 1080)]
+DENSITIES = [5, 20, 60]
+REPEAT = 7
+BLUR = 5
+
+
+def base_params(width, height):
+    return {
+        "hsv_min": (0, 0, 70),
+        "hsv_max": (179, 255, 255),
+        "threshold": (70, 255),
+        "blur": BLUR,
+        "inverse_mask": False,
+        "segmentation_type": "by_limiar",
+        "circle_hough": hough_params_for(width, height),
+        "pyramid_levels": 0,
+        "circle_engine": "hough",
+    }
+
+
+def median_ms(fn, repeat=REPEAT):
+    fn()  # aquecimento
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return float(np.median(times)) * 1000
+
+
+def stage_cases(frame, params):
+    """Casos de cada etapa de ProcessImage: nome -> função sem argumentos."""
+    hough = params["circle_hough"]
+    ready = ProcessImage(frame, blur=BLUR)
+    mask = ready.create_mask_by_threshold(*params["threshold"])
+    mask_clean = ready.remove_noise(mask)
+    ready.get_class_map()
+    lower, upper = np.array([params["hsv_min"], params["hsv_max"]])
+
+    def fresh():
+        # Cada repetição começa sem planos em cache (o desfoque entra na medição)
+        return ProcessImage(frame, blur=BLUR)
+
+    return {
+        "blur": lambda: fresh().context.blurred,
+        "hsv": lambda: fresh().context.hsv,
+        "mask_hsv": lambda: ready.create_mask_by_HSV(lower, upper),
+        "mask_threshold": lambda: ready.create_mask_by_threshold(*params["threshold"]),
+        "mask_class": lambda: fresh().create_mask_by_class(),
+        "remove_noise": lambda: ready.remove_noise(mask),
+        "features": lambda: ready.extract_object_features(mask_clean, min_area=170),
+        "circles_hough": lambda: ready.find_circles(mask_clean, "hough", 0, *hough),
+        "circles_pyramid": lambda: ready.find_circles(mask_clean, "hough", 1, *hough),
+        "circles_contour": lambda: ready.find_circles(mask_clean, "contour", 0, *hough),
+        "circles_hybrid": lambda: ready.find_circles(mask_clean, "hybrid", 0, *hough),
+        "objects_detection": lambda: ready.objects_detection(mask_clean),
+    }
+
+
+def chain_cases(frame, params):
+    """Cadeia completa, como no vídeo ao vivo (com BufferPool) e na imagem congelada (StageGraph)."""
+    pool = BufferPool(generations=2)
+    graph = StageGraph(STAGES)
+    tuned = dict(params)
+
+    def live():
+        pool.next_generation()
+        return processar_frame(frame, params, pool)
+
+    def static_param2():
+        # Mexer só no param2 do Hough com a imagem congelada
+        hough = list(tuned["circle_hough"])
+        hough[3] = hough[3] + 1 if hough[3] % 2 == 0 else hough[3] - 1
+        tuned["circle_hough"] = tuple(hough)
+        return processar_frame(frame, tuned, None, graph)
+
+    return {
+        "chain": lambda: processar_frame(frame, params),
+        "chain_pool": live,
+        "chain_contour": lambda: processar_frame(frame, dict(params, circle_engine="contour")),
+        "chain_static_param2": static_param2,
+    }
+
+
+def run_suite(resolutions, densities):
+    results = {}
+    for width, height in resolutions:
+        params = base_params(width, height)
+        for density in densities:
+            frame, _ = make_frame(width, height, density, seed=density)
+            cases = stage_cases(frame, params)
+            cases.update(chain_cases(frame, params))
+            for name, fn in cases.items():
+                key = f"{name}@{width}x{height}/n{density}"
+                results[key] = median_ms(fn)
+                print(f"{key:<42} {results[key]:9.3f} ms")
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms=0.1):
+    """
+    Lista de (caso, ms do baseline, ms atual, variação) dos casos mais lentos
+    do que threshold. Diferenças abaixo de min_delta_ms são ruído de medição.
+    """
+    regressions = []
+    for key, ms in results.items():
+        base = baseline.get(key)
+        if base is None or base <= 0:
+            continue
+        change = ms / base - 1
+        if change > threshold and ms - base > min_delta_ms:
+            regressions.append((key, base, ms, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks da cadeia de processamento")
+    parser.add_argument("--out", default=os.path.join(RESULTS_DIR, "latest.json"))
+    parser.add_argument("--compare", help="JSON de baseline para comparar")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Regressão tolerada (fração, padrão 0.2)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.1, help="Diferença absoluta mínima para contar (ms)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--quick", action="store_true")
+    args = parser.parse_args()
+
+    resolutions = RESOLUTIONS[:1] if args.quick else RESOLUTIONS
+    densities = DENSITIES[:1] if args.quick else DENSITIES
+    results = run_suite(resolutions, densities)
+
+    report = {
+        "meta": {
+            "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "python": platform.python_version(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "repeat": REPEAT,
+        },
+        "results_ms": results,
+    }
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResultados gravados em {args.out}")
+    if args.save_baseline:
+        with open(os.path.join(RESULTS_DIR, "baseline.json"), "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline gravado em {os.path.join(RESULTS_DIR, 'baseline.json')}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results_ms"]
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regressões acima de {args.threshold:.0%}:")
+            for key, base, ms, change in sorted(regressions, key=lambda r: -r[3]):
+                print(f"  {key:<42} {base:9.3f} -> {ms:9.3f} ms ({change:+.0%})")
+            sys.exit(1)
+        print(f"\nSem regressões acima de {args.threshold:.0%} face a {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,13 +24,21 @@ class SubHandler:
         # Atualiza o histórico com o novo valor
         self._last_values[node_id_str] = val
 
-async def main():
+ENDPOINT = "opc.tcp://0.0.0.0:4840"
+
+
+async def create_server(endpoint=ENDPOINT, monitor=True):
+    """
+    Cria e inicializa o servidor de teste (ainda não iniciado).
+    Retorna (server, nodes), com nodes = {"SinalPython": node, "CamaraS": node}.
+    Reutilizado por main() e pelos harnesses de teste (ex.: bench_plc_latency).
+    """
     # Configuração básica do servidor
     server = Server()
     await server.init()
     
     # Define o endpoint. 0.0.0.0 permite conexões de qualquer IP na rede local
-    server.set_endpoint("opc.tcp://0.0.0.0:4840")
+    server.set_endpoint(endpoint)
     
     # Nome do servidor exibido para clientes
     server.set_server_name("Meu Servidor OPCUA Python")
@@ -76,18 +84,24 @@ async def main():
     await SinalPython.set_writable()
     await CamaraS.set_writable()
 
-    # --- CONFIGURAÇÃO DO MONITORAMENTO (SUBSCRIPTION) ---
-    # Criamos o handler e a assinatura
-    handler = SubHandler()
-    sub = await server.create_subscription(500, handler) # Checa a cada 500ms
-    
-    # Inscrevemos a variável no monitoramento
-    await sub.subscribe_data_change(SinalPython)
-    await sub.subscribe_data_change(CamaraS)
+    if monitor:
+        # --- CONFIGURAÇÃO DO MONITORAMENTO (SUBSCRIPTION) ---
+        # Criamos o handler e a assinatura
+        handler = SubHandler()
+        sub = await server.create_subscription(500, handler) # Checa a cada 500ms
+        
+        # Inscrevemos a variável no monitoramento
+        await sub.subscribe_data_change(SinalPython)
+        await sub.subscribe_data_change(CamaraS)
+
+    return server, {"SinalPython": SinalPython, "CamaraS": CamaraS}
+
+async def main():
+    server, nodes = await create_server()
 
     print("Servidor rodando!")
-    print(f"Endpoint: opc.tcp://0.0.0.0:4840")
-    print(f"Variável monitorada: {var_node_id}")
+    print(f"Endpoint: {ENDPOINT}")
+    print(f"Variável monitorada: {nodes['SinalPython'].nodeid.to_string()}")
     print("Pressione Ctrl+C para parar.")
 
     # Loop principal
@@ -0,0 +1,129 @@
+import time
+
+import cv2
+import numpy as np
+
+# Cores BGR das peças sintéticas (as mesmas classes de ColorClassifier)
+PART_COLORS = {
+    "red": (40, 40, 220),
+    "blue": (220, 80, 30),
+    "white": (235, 235, 235),
+}
+
+
+def make_frame(width=640, height=480, n_objects=8, seed=0, noise=8, squares=0.25, holes=0.2):
+    """
+    Gera um frame sintético e determinístico de uma esteira com peças.
+
+    Fundo escuro com ruído gaussiano, peças circulares (algumas com furo) e
+    quadradas, sem sobreposição. O raio das peças escala com a resolução.
+    Retorna (frame BGR, lista de círculos verdadeiros [(x, y, r, cor), ...]).
+    """
+    rng = np.random.default_rng(seed)
+    frame = np.full((height, width, 3), 45, dtype=np.uint8)
+
+    scale = min(width, height) / 480
+    r_min, r_max = int(14 * scale), int(32 * scale)
+    placed = []
+    circles = []
+    attempts = 0
+    while len(placed) < n_objects and attempts < n_objects * 50:
+        attempts += 1
+        r = int(rng.integers(r_min, r_max + 1))
+        x = int(rng.integers(r + 2, width - r - 2))
+        y = int(rng.integers(r + 2, height - r - 2))
+        if any((x - px) ** 2 + (y - py) ** 2 < (r + pr + 6) ** 2 for px, py, pr in placed):
+            continue
+        placed.append((x, y, r))
+
+        name = list(PART_COLORS)[int(rng.integers(0, len(PART_COLORS)))]
+        color = PART_COLORS[name]
+        if rng.random() < squares:
+            side = int(r * 1.6)
+            cv2.rectangle(frame, (x - side // 2, y - side // 2), (x + side // 2, y + side // 2), color, -1)
+            continue
+
+        cv2.circle(frame, (x, y), r, color, -1, lineType=cv2.LINE_AA)
+        if rng.random() < holes:
+            cv2.circle(frame, (x, y), max(2, r // 3), (45, 45, 45), -1, lineType=cv2.LINE_AA)
+        circles.append((x, y, r, name))
+
+    if noise:
+        frame = cv2.add(frame, rng.normal(0, noise, frame.shape).clip(-128, 127).astype(np.int8), dtype=cv2.CV_8U)
+    return frame, circles
+
+
+def hough_params_for(width, height):
+    """Parâmetros circle_hough (dp, min_dist, param1, param2, min_r, max_r) adequados à resolução do frame."""
+    scale = min(width, height) / 480
+    return (1, int(30 * scale), 50, int(18 * scale) + 7, int(10 * scale), int(40 * scale))
+
+
+def match_circles(detected, truth, tolerance=0.5):
+    """
+    Associa círculos detetados aos verdadeiros (centro a menos de tolerance*r).
+    Retorna dicionário com recall, precision, erro médio de centro e de raio (px).
+    """
+    used = set()
+    center_err, radius_err = [], []
+    for tx, ty, tr, *_ in truth:
+        best, best_d = None, None
+        for i, (x, y, r) in enumerate(detected):
+            if i in used:
+                continue
+            d = float(np.hypot(float(x) - tx, float(y) - ty))
+            if d <= tolerance * tr and (best_d is None or d < best_d):
+                best, best_d = i, d
+        if best is not None:
+            used.add(best)
+            center_err.append(best_d)
+            radius_err.append(abs(float(detected[best][2]) - tr))
+    return {
+        "recall": len(used) / len(truth) if truth else 1.0,
+        "precision": len(used) / len(detected) if len(detected) else 1.0,
+        "center_error": float(np.mean(center_err)) if center_err else 0.0,
+        "radius_error": float(np.mean(radius_err)) if radius_err else 0.0,
+    }
+
+
+class SyntheticCapture:
+    """
+    Substituto de cv2.VideoCapture para harnesses sem câmera.
+
+    Entrega ciclicamente `n_frames` frames de make_frame ao ritmo de `fps`
+    (read() bloqueia como uma câmera real). Com `path`, lê um vídeo gravado
+    em ciclo, ao mesmo ritmo.
+    """
+    def __init__(self, width=640, height=480, n_objects=8, fps=30, n_frames=8, path=None):
+        self.period = 1.0 / fps if fps else 0.0
+        self.frames = [] if path else [make_frame(width, height, n_objects, seed=i)[0] for i in range(n_frames)]
+        self._video = cv2.VideoCapture(path) if path else None
+        self._index = 0
+        self._next_at = None
+        self._opened = True
+
+    def isOpened(self):
+        return self._opened
+
+    def read(self):
+        if not self._opened:
+            return False, None
+        now = time.perf_counter()
+        if self._next_at is not None and now < self._next_at:
+            time.sleep(self._next_at - now)
+        self._next_at = max(now, self._next_at or now) + self.period
+
+        if self._video is not None:
+            ret, frame = self._video.read()
+            if not ret:
+                self._video.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = self._video.read()
+            return ret, frame
+        frame = self.frames[self._index % len(self.frames)]
+        self._index += 1
+        return True, frame
+
+    def release(self):
+        self._opened = False
+        if self._video is not None:
+            self._video.release()
@@ -0,0 +1,42 @@
+"""
+Regressão: objects_detection numa máscara sem objetos (toda a zeros).
+
+A agregação de cor por região chamava cv.cvtColor com um array vazio e
+rebentava em qualquer frame sem peças. Corre com o tracker e sem ele.
+
+Uso (na raiz do repositório):
+    python -m tests.test_empty_mask
+"""
+import numpy as np
+
+from src.controller.util.ColorClassifier import ColorClassifier
+from src.controller.util.ObjectTracker import ObjectTracker
+from src.controller.util.ProcessImage import ProcessImage
+
+
+def test_to_hsv_empty():
+    hsv = ColorClassifier.to_hsv(np.zeros((0, 3)))
+    assert hsv.shape == (0, 3)
+
+
+def test_objects_detection_empty_mask(tracker=None):
+    image = np.full((120, 160, 3), 90, np.uint8)
+    mask = np.zeros((120, 160), np.uint8)
+    process = ProcessImage(image)
+    overlay = process.objects_detection(mask, show_contours=True, show_color=True, show_id=True,
+                                        tracker=tracker, frame_id=0 if tracker else None)
+    assert overlay.shape == image.shape
+    assert process.stats["total_objects"] == 0
+    assert process.stats["undefined_objects"] == 0
+    assert not any(isinstance(v, dict) for v in process.objects.values())
+
+
+def test_objects_detection_empty_mask_tracked():
+    test_objects_detection_empty_mask(ObjectTracker())
+
+
+if __name__ == "__main__":
+    test_to_hsv_empty()
+    test_objects_detection_empty_mask()
+    test_objects_detection_empty_mask_tracked()
+    print("OK: máscara vazia não gera objetos nem erros")
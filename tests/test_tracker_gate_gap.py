@@ -0,0 +1,57 @@
+"""
+Regressão: peça que pára enquanto o MotionGate salta frames.
+
+Uma peça anda 5 px/frame nos frames 0-4 e fica parada; o MotionGate salta os
+frames seguintes e o próximo resultado é o do frame de captura 35. Com o
+tracker a prever pela diferença de ids de captura, a posição prevista caía
+fora de max_distance e a mesma peça era contada (e sinalizada ao PLC) duas vezes.
+
+Uso (na raiz do repositório):
+    python -m tests.test_tracker_gate_gap
+"""
+from src.controller.ProcessingPipeline import ProcessingResult
+from src.controller.VideoController import VideoController
+
+
+class _Var:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+    def set(self, value):
+        self.value = value
+
+
+class _View:
+    """O mínimo da PaginaVideo que aplicar_resultado usa (sem Tkinter)."""
+    def __init__(self):
+        self.var_pecas_detectadas = _Var("0")
+        self.var_mode_trigger = _Var(False)
+        self.var_imagem_tipo = _Var("img_resultado")
+
+    def after(self, ms, callback):
+        pass
+
+    def atualizar_visualizacao_final(self, *args, **kwargs):
+        pass
+
+
+def _result(frame_id, x):
+    return ProcessingResult(frame_id=frame_id, timestamp=0.0, img_resultado=None, mask=None,
+                            mask_clean=None, circles=[(x, 100, 20)], circle_detected=True)
+
+
+def test_stopped_part_after_gate_skip_keeps_its_id():
+    controller = VideoController(_View(), None)
+    for frame_id, x in [(0, 100), (1, 105), (2, 110), (3, 115), (4, 120), (35, 120)]:
+        controller.aplicar_resultado(_result(frame_id, x))
+    assert controller.tracker.total == 1
+    assert list(controller.tracker.tracks) == [1]
+    assert controller.parts_to_signal == {1}
+
+
+if __name__ == "__main__":
+    test_stopped_part_after_gate_skip_keeps_its_id()
+    print("OK: a peça parada mantém o ID depois dos frames saltados")